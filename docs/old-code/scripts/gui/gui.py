@@ -1,11 +1,11 @@
 import logging
-import cv2
 import sys
 import asyncio
 
 from qasync import QEventLoop
-from PySide6.QtGui import QImage, QPixmap
-from PySide6.QtCore import QSize, Qt, QMargins
+from PySide6.QtGui import QImage, QPixmap, QPainter
+from PySide6.QtCore import QSize, Qt, QMargins, QRect, QTimer
+from PySide6.QtOpenGLWidgets import QOpenGLWidget
 from PySide6.QtWidgets import (
     QApplication,
     QLabel,
@@ -20,20 +20,69 @@ from PySide6.QtWidgets import (
 
 from reciever import run_receiver
 
+
+class VideoGLWidget(QOpenGLWidget):
+    """Video surface that lets the GPU do the scaling."""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._image = None
+        self._hud_text = ""
+        
+        # Allow the widget to shrink below the frame size
+        self.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+    
+    def set_image(self, q_image, hud_text=""):
+        """Store the next frame and its HUD text and schedule a repaint."""
+        self._image = q_image
+        self._hud_text = hud_text
+        self.update()
+    
+    def paintGL(self):
+        # QPainter on a QOpenGLWidget uses the GL paint engine: the frame is
+        # uploaded as a texture and scaled by the GPU with linear filtering
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        
+        if self._image is not None:
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            
+            # Fit while maintaining aspect ratio, centered
+            size = self._image.size().scaled(self.size(), Qt.KeepAspectRatio)
+            target = QRect(0, 0, size.width(), size.height())
+            target.moveCenter(self.rect().center())
+            painter.drawImage(target, self._image)
+            
+            # HUD drawn by Qt on top of the frame, the receiver no longer
+            # rasterizes it into the pixel buffer
+            if self._hud_text:
+                painter.setPen(Qt.green)
+                painter.drawText(target.adjusted(10, 10, -10, -10), Qt.AlignLeft | Qt.AlignTop, self._hud_text)
+        
+        painter.end()
+
+
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, use_opengl=True):
         super().__init__()
         
         self.setWindowTitle("My App")
         
-        self.video_label = QLabel()
-        self.video_label.setScaledContents(False)  # Don't stretch!
-        self.video_label.setAlignment(Qt.AlignCenter)  # Center the video
-        
-        # Allow the label to shrink below its content size
-        self.video_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.use_opengl = use_opengl
         
-        self.setCentralWidget(self.video_label)
+        if self.use_opengl:
+            self.video_widget = VideoGLWidget()
+            self.setCentralWidget(self.video_widget)
+        else:
+            # Fallback when no GL context is available
+            self.video_label = QLabel()
+            self.video_label.setScaledContents(False)  # Don't stretch!
+            self.video_label.setAlignment(Qt.AlignCenter)  # Center the video
+            
+            # Allow the label to shrink below its content size
+            self.video_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+            
+            self.setCentralWidget(self.video_label)
                 
         self.resize(800, 600)
         
@@ -42,23 +91,50 @@ class MainWindow(QMainWindow):
         
         # Store the original pixmap for rescaling
         self.original_pixmap = None
+        self._last_scaled_size = None
+        
+        # Keep the last frame alive, QImage only wraps its buffer
+        self._last_frame = None
+        self._frame_count = 0
+        
+        # Coalesce bursts of resize events into one rescale (~60 Hz)
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(16)
+        self._resize_timer.timeout.connect(self._update_video_display)
         
         
     def display_frame(self, frame_array):
-        rgb_frame = cv2.cvtColor(frame_array, cv2.COLOR_BGR2RGB)
+        # Qt reads BGR directly, no cvtColor copy needed
+        self._last_frame = frame_array
+        self._frame_count += 1
         
-        height, width, channels = rgb_frame.shape
+        height, width, channels = frame_array.shape
         bytes_per_line = 3 * width
         
-        q_image = QImage(rgb_frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-        self.original_pixmap = QPixmap.fromImage(q_image)
+        q_image = QImage(frame_array.data, width, height, bytes_per_line, QImage.Format_BGR888)
+        
+        if self.use_opengl:
+            # No CPU rescale, the GPU scales on paint
+            self.video_widget.set_image(q_image, f"Frame: {self._frame_count}")
+            return
+        
+        # Fallback path: no implicit reformat, BGR888 is uploaded as is.
+        # The QImage shares frame_array's buffer, pinned in _last_frame.
+        self.original_pixmap = QPixmap.fromImage(q_image, Qt.ImageConversionFlag.NoFormatConversion)
         
         # Update the display
-        self._update_video_display()
+        self._update_video_display(new_frame=True)
     
-    def _update_video_display(self):
-        """Scale and display the video frame."""
+    def _update_video_display(self, new_frame=False):
+        """Scale and display the video frame (QLabel fallback only)."""
+        # The scaled result only depends on the frame and the label size
+        if not new_frame and self.video_label.size() == self._last_scaled_size:
+            return
+        
         if self.original_pixmap:
+            self._last_scaled_size = self.video_label.size()
+            
             # Scale to fit while maintaining aspect ratio
             scaled_pixmap = self.original_pixmap.scaled(
                 self.video_label.size(),
@@ -70,7 +146,8 @@ class MainWindow(QMainWindow):
     def resizeEvent(self, event):
         """Handle window resize - rescale video to fit new size."""
         super().resizeEvent(event)
-        self._update_video_display()
+        if not self.use_opengl:
+            self._resize_timer.start()
         
         
         
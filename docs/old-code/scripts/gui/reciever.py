@@ -5,15 +5,18 @@ recieves real-time video stream.
 """
 
 import asyncio
+import concurrent.futures
 from PySide6 import QtAsyncio
 import cv2
 import numpy as np
 from aiortc import RTCPeerConnection, RTCSessionDescription, MediaStreamTrack
 from av import VideoFrame
-from datetime import datetime
+from av.video.reformatter import VideoReformatter
+from collections import OrderedDict
 import logging
 import os
 import sys
+import time
 from pathlib import Path
 
 # Add parent directories to path for imports
@@ -22,10 +25,99 @@ from apelios.signaling_server import WebSocketSignaling
 
 logger = logging.getLogger(__name__)
 
+# Overlay text style
+OVERLAY_FONT = cv2.FONT_HERSHEY_SIMPLEX
+OVERLAY_SCALE = 0.7
+OVERLAY_COLOR = (0, 255, 0)
+OVERLAY_THICKNESS = 2
+
+# q85 with optimized Huffman tables is much cheaper to encode than the q95 default
+JPEG_PARAMS = [
+    cv2.IMWRITE_JPEG_QUALITY, 85,
+    cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+    cv2.IMWRITE_JPEG_PROGRESSIVE, 0,
+]
+
+# Encodes allowed in flight, further saves are dropped instead of queued
+MAX_PENDING_SAVES = 4
+
+# Seconds without a frame before handle_track counts a timeout
+FRAME_TIMEOUT = 5.0
+
+
+class OverlayTextCache:
+    """
+    Small LRU of pre-rendered text strips.
+    
+    Text is rasterized once with cv2.putText into a small canvas and then
+    copied onto frames with a masked numpy assignment, instead of
+    rasterizing the glyphs again on every frame.
+    """
+    
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._strips = OrderedDict()
+    
+    def _render(self, text):
+        (width, height), baseline = cv2.getTextSize(
+            text, OVERLAY_FONT, OVERLAY_SCALE, OVERLAY_THICKNESS
+        )
+        canvas = np.zeros((height + baseline, width, 3), dtype=np.uint8)
+        # LINE_8, not LINE_AA: the strip is pasted through a binary mask,
+        # anti-aliased edge pixels would land as a dark halo, not blended
+        cv2.putText(
+            canvas, text, (0, height),
+            OVERLAY_FONT, OVERLAY_SCALE, OVERLAY_COLOR, OVERLAY_THICKNESS, cv2.LINE_8
+        )
+        mask = canvas.any(axis=2)
+        return canvas, mask, height
+    
+    def get(self, text):
+        """Return (strip, mask, ascent) for text, rendering it on a miss."""
+        strip = self._strips.get(text)
+        if strip is None:
+            strip = self._render(text)
+            self._strips[text] = strip
+            if len(self._strips) > self.maxsize:
+                self._strips.popitem(last=False)
+        else:
+            self._strips.move_to_end(text)
+        return strip
+    
+    def draw(self, frame, text, x, y):
+        """
+        Blit text onto frame with its baseline at (x, y).
+        
+        Returns:
+            x position right after the drawn text
+        """
+        strip, mask, ascent = self.get(text)
+        top = y - ascent
+        height, width = mask.shape
+        
+        # Clip to the frame
+        if top < 0 or x < 0 or top + height > frame.shape[0]:
+            return x + width
+        width = min(width, frame.shape[1] - x)
+        if width <= 0:
+            return x
+        
+        roi = frame[top:top + height, x:x + width]
+        roi[mask[:, :width]] = strip[:, :width][mask[:, :width]]
+        return x + width
+    
+    def draw_chars(self, frame, text, x, y):
+        """Blit text glyph by glyph, for strings that change every frame."""
+        for char in text:
+            x = self.draw(frame, char, x, y)
+        return x
+
+
 class VideoReceiver:
     """WebRTC video stream receiver."""
     
-    def __init__(self, display=True, save_frames=False, output_dir="frames", frame_callback=None):
+    def __init__(self, display=True, save_frames=False, output_dir="frames", frame_callback=None,
+                 pixel_format="bgr24"):
         """
         Initialize video receiver.
         
@@ -34,19 +126,107 @@ class VideoReceiver:
             save_frames: Save frames to disk
             output_dir: Directory for saved frames
             frame_callback: Optional callback function(frame_array) called for each frame
+            pixel_format: Format handed to frame_callback. "rgb24" skips the
+                BGR swap for RGB sinks, "yuv420p" passes the planar decoder
+                output (shape (h * 3 // 2, w)) without any colorspace conversion
         """
+        if pixel_format != "bgr24" and (frame_callback is None or save_frames):
+            # The OpenCV window, the overlay and imwrite all expect BGR
+            raise ValueError(f"pixel_format {pixel_format!r} needs a frame_callback and no save_frames")
+        
         self.display = display
         self.save_frames = save_frames
         self.output_dir = output_dir
         self.frame_callback = frame_callback
+        self.pixel_format = pixel_format
         self.track = None
         self.frame_count = 0
         self.running = True
         
+        # Set once the receiver is done, so waiters wake without polling
+        self._stop_event = asyncio.Event()
+        
+        self._text_cache = OverlayTextCache()
+        
+        # Wall clock anchor, per-frame timestamps only read the monotonic clock
+        self._t0_wall = time.time()
+        self._t0_mono = time.monotonic()
+        self._ts_second = None
+        self._ts_text = ""
+        
+        # One reformatter for the whole stream, so the swscale context is
+        # reused instead of being rebuilt for every decoded frame
+        self._reformatter = VideoReformatter()
+        
+        # Single worker so JPEG encodes never run on the event loop
+        self._io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._pending_saves = 0
+        
         # Create output directory
         if self.save_frames:
             os.makedirs(self.output_dir, exist_ok=True)
     
+    def stop(self):
+        """Stop receiving and wake anyone waiting for the receiver to finish."""
+        self.running = False
+        self._stop_event.set()
+    
+    def _draw_overlay(self, frame_array):
+        """Draw frame counter and timestamp into the frame."""
+        # Pre-rendered strips: static text and the seconds are cached,
+        # changing digits are drawn per glyph
+        x = self._text_cache.draw(frame_array, "Frame: ", 10, 30)
+        self._text_cache.draw_chars(frame_array, str(self.frame_count), x, 30)
+        
+        now = self._t0_wall + (time.monotonic() - self._t0_mono)
+        second = int(now)
+        if second != self._ts_second:
+            self._ts_second = second
+            self._ts_text = time.strftime("%H:%M:%S", time.localtime(second))
+        
+        x = self._text_cache.draw(frame_array, self._ts_text, 10, 60)
+        self._text_cache.draw_chars(
+            frame_array, f".{int((now - second) * 1000):03d}", x, 60
+        )
+    
+    def _save_frame(self, filename, frame_array):
+        """
+        Write a frame to disk on the I/O worker thread.
+        
+        Returns:
+            False if the frame was dropped because the writer is behind
+        """
+        # Backpressure: drop the frame rather than letting copies pile up
+        # in the executor queue when the disk can't keep up
+        if self._pending_saves >= MAX_PENDING_SAVES:
+            logger.warning(f"Writer busy, dropped {filename}")
+            return False
+        
+        self._pending_saves += 1
+        # Copy, the frame buffer gets reused by the next decode
+        future = asyncio.get_running_loop().run_in_executor(
+            self._io_executor, cv2.imwrite, filename, frame_array.copy(), JPEG_PARAMS
+        )
+        future.add_done_callback(self._save_done)
+        return True
+    
+    def _save_done(self, future):
+        self._pending_saves -= 1
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Saving frame failed: {future.exception()}")
+    
+    async def _prefetch_frames(self, track, queue):
+        """Pull frames off the track while the previous one is being processed."""
+        while self.running:
+            try:
+                frame = await track.recv()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Hand errors to the consumer, it owns the retry policy
+                frame = e
+            await queue.put(frame)
+    
     async def handle_track(self, track):
         """Handle incoming video track."""
         logger.info(f"Starting to handle {track.kind} track")
@@ -54,17 +234,49 @@ class VideoReceiver:
         consecutive_errors = 0
         max_consecutive_errors = 10
         
+        # Small bounded queue: recv of the next frame overlaps with the
+        # conversion/overlay/display of the current one
+        frame_queue = asyncio.Queue(maxsize=2)
+        prefetch_task = asyncio.create_task(self._prefetch_frames(track, frame_queue))
+        
+        # One self-rearming watchdog instead of a wait_for task and timer per
+        # frame: it queues a TimeoutError once no frame arrived for FRAME_TIMEOUT
+        loop = asyncio.get_running_loop()
+        last_frame_time = loop.time()
+        
+        def watchdog():
+            nonlocal watchdog_handle
+            deadline = last_frame_time + FRAME_TIMEOUT
+            if loop.time() >= deadline:
+                if frame_queue.empty():
+                    frame_queue.put_nowait(asyncio.TimeoutError())
+                deadline = loop.time() + FRAME_TIMEOUT
+            watchdog_handle = loop.call_at(deadline, watchdog)
+        
+        watchdog_handle = loop.call_at(last_frame_time + FRAME_TIMEOUT, watchdog)
+        
         while self.running:
             try:
-                # Receive frame with timeout
-                frame = await asyncio.wait_for(track.recv(), timeout=5.0)
+                frame = await frame_queue.get()
+                last_frame_time = loop.time()
+                if isinstance(frame, Exception):
+                    raise frame
                 
                 consecutive_errors = 0
                 self.frame_count += 1
                 
                 # Convert frame to numpy array
                 if isinstance(frame, VideoFrame):
-                    frame_array = frame.to_ndarray(format="bgr24")
+                    # No per-frame ndarray allocation: for packed formats
+                    # to_ndarray is a view on the frame's own plane, so the
+                    # overlay is drawn straight into the decoder/swscale output.
+                    # Consumers that keep a frame past the next one must copy
+                    if frame.format.name == self.pixel_format:
+                        # Already in the wanted format, no swscale pass at all
+                        frame_array = frame.to_ndarray()
+                    else:
+                        converted = self._reformatter.reformat(frame, format=self.pixel_format)
+                        frame_array = converted.to_ndarray()
                 elif isinstance(frame, np.ndarray):
                     frame_array = frame
                 else:
@@ -73,29 +285,18 @@ class VideoReceiver:
                 
                 annotated_frame = frame_array
                 
-                # Add info overlay
-                info_text = [
-                    f"Frame: {self.frame_count}",
-                    datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                ]
+                # Save every 30th frame
+                save_frame = self.save_frames and self.frame_count % 30 == 0
                 
-                y_offset = 30
-                for i, text in enumerate(info_text):
-                    cv2.putText(
-                        annotated_frame,
-                        text,
-                        (10, y_offset + i * 30),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.7,
-                        (0, 255, 0),
-                        2,
-                        cv2.LINE_AA
-                    )
+                # Only rasterize the overlay into frames that end up in the
+                # OpenCV window or on disk. A frame_callback gets the clean
+                # frame, the Qt GUI paints its own HUD
+                if save_frame or (self.display and not self.frame_callback):
+                    self._draw_overlay(annotated_frame)
                 
-                if self.save_frames and self.frame_count % 30 == 0:
-                    # Save every 30th frame
+                if save_frame:
                     filename = f"{self.output_dir}/frame_{self.frame_count}.jpg"
-                    cv2.imwrite(filename, annotated_frame)
+                    self._save_frame(filename, annotated_frame)
                 
                 # Send frame to callback or display with cv2
                 if self.frame_callback:
@@ -116,8 +317,8 @@ class VideoReceiver:
                     elif key == ord('s'):
                         # Save frame manually
                         filename = f"{self.output_dir}/manual_{self.frame_count}.jpg"
-                        cv2.imwrite(filename, annotated_frame)
-                        logger.info(f"Saved frame to {filename}")
+                        if self._save_frame(filename, annotated_frame):
+                            logger.info(f"Saved frame to {filename}")
                 
             except asyncio.TimeoutError:
                 consecutive_errors += 1
@@ -126,7 +327,6 @@ class VideoReceiver:
                     logger.error("Too many consecutive timeouts")
                     self.running = False
                     break
-                await asyncio.sleep(0.5)
                 
             except asyncio.CancelledError:
                 logger.info("Track handling cancelled")
@@ -141,13 +341,21 @@ class VideoReceiver:
                     break
                 await asyncio.sleep(0.5)
         
+        prefetch_task.cancel()
+        watchdog_handle.cancel()
+        
         logger.info(f"Stopped. Frames: {self.frame_count}")
+        self.stop()
+        
+        # Let pending writes finish without blocking the loop
+        self._io_executor.shutdown(wait=False)
         
         if self.display:
             cv2.destroyAllWindows()
 
 
-async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=False, frame_callback=None):
+async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=False, frame_callback=None,
+                       pixel_format="bgr24"):
     """
     Run the WebRTC video stream receiver.
     
@@ -157,6 +365,7 @@ async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=Fa
         display: Show video window (ignored if frame_callback is set)
         save_frames: Save frames to disk
         frame_callback: Optional callback function(frame_array) called for each frame
+        pixel_format: Format handed to frame_callback, see VideoReceiver
     """
     logger.info(f"Starting WebRTC receiver connecting to {host}:{port}")
     
@@ -166,7 +375,8 @@ async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=Fa
     video_receiver = VideoReceiver(
         display=display, 
         save_frames=save_frames,
-        frame_callback=frame_callback
+        frame_callback=frame_callback,
+        pixel_format=pixel_format
     )
     
     @pc.on("track")
@@ -180,7 +390,7 @@ async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=Fa
     async def on_connectionstatechange():
         logger.info(f"Connection state: {pc.connectionState}")
         if pc.connectionState in ["failed", "closed"]:
-            video_receiver.running = False
+            video_receiver.stop()
     
     try:
         await signaling.connect()
@@ -209,8 +419,7 @@ async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=Fa
         status = "Starting video stream..."
         logger.info(f"Connection established! {status}")
         
-        while video_receiver.running:
-            await asyncio.sleep(0.1)
+        await video_receiver._stop_event.wait()
         
     except KeyboardInterrupt:
         logger.info("Interrupted by user")
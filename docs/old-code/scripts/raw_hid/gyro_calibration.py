@@ -1,58 +1,143 @@
 import hid
+import math
 import threading
-import struct
+import numpy as np
 import pygame
-from scipy.spatial.transform import Rotation as R
+from numba import njit
 import pygame_widgets
 from pygame_widgets.slider import Slider
 
 # --- 1. HID Configuration ---
 DEVICE_PATH = b"/dev/hidraw2"
 
+# Quaternion components are int16, 1.0 == 16384
+QUAT_SCALE = 1.0 / 16384.0
+
+# Max HID reports processed per batch
+HID_BATCH = 32
+
+# Rates below this (degrees per report) are treated as noise
+DEADZONE = 0.01
+
 # Global variable to store the stable, local roll rate we are calibrating
 stable_local_roll_rate = 0.0
 
+# Integrated, scaled roll. Only written by the HID thread.
+total_roll = 0.0
+
 # We still need the full quaternion logic to produce the stable data
-previous_device_orientation = R.identity()
+# Orientation is kept as a unit quaternion (x, y, z, w)
+previous_device_orientation = np.array([0.0, 0.0, 0.0, 1.0])
 is_first_frame = True
 
+
+@njit(cache=True, fastmath=True, nogil=True)
+def delta_roll_deg(prev_xyzw, cur_xyzw):
+    """
+    Roll rate between two orientations.
+    
+    Computes the local delta rotation prev^-1 * cur and returns its first
+    'zyx' Euler angle in degrees (same as scipy's as_euler('zyx')[0]).
+    
+    Returns:
+        (normalized cur_xyzw as the next prev, roll in degrees)
+    """
+    norm = math.sqrt(
+        cur_xyzw[0] * cur_xyzw[0] + cur_xyzw[1] * cur_xyzw[1]
+        + cur_xyzw[2] * cur_xyzw[2] + cur_xyzw[3] * cur_xyzw[3]
+    )
+    if norm == 0.0:
+        raise ValueError("zero norm quaternion")
+    cur = cur_xyzw / norm
+    
+    px, py, pz, pw = prev_xyzw[0], prev_xyzw[1], prev_xyzw[2], prev_xyzw[3]
+    cx, cy, cz, cw = cur[0], cur[1], cur[2], cur[3]
+    
+    # Hamilton product conj(prev) * cur (conjugate == inverse for unit quats)
+    w = pw * cw + px * cx + py * cy + pz * cz
+    x = pw * cx - px * cw - py * cz + pz * cy
+    y = pw * cy + px * cz - py * cw - pz * cx
+    z = pw * cz - px * cy + py * cx - pz * cw
+    
+    roll = math.atan2(2.0 * (w * z - x * y), 1.0 - 2.0 * (y * y + z * z))
+    return cur, roll * (180.0 / math.pi)
+
+
+@njit(cache=True, nogil=True)
+def process_reports(reports, count, prev_xyzw, is_first, roll_rates, deadzone):
+    """
+    Roll rates for a batch of raw 64-byte HID reports.
+    
+    Writes one rate per report into roll_rates.
+    
+    Returns:
+        updated (prev_xyzw, is_first) orientation state and the summed
+        roll of the batch with the deadzone applied
+    """
+    q = np.empty(4)
+    cur = np.empty(4)
+    for i in range(count):
+        # 4 little-endian int16 quaternion fields (x, y, z, w) at bytes 36..43
+        for k in range(4):
+            value = np.int32(reports[i, 36 + 2 * k]) | (np.int32(reports[i, 37 + 2 * k]) << 8)
+            if value >= 32768:
+                value -= 65536
+            q[k] = value * QUAT_SCALE
+        
+        # This is our established mapping for the device's axes
+        cur[0], cur[1], cur[2], cur[3] = q[2], q[1], q[0], q[3]
+        
+        if cur[0] == 0.0 and cur[1] == 0.0 and cur[2] == 0.0 and cur[3] == 0.0:
+            # Invalid report, start over
+            is_first = True
+            roll_rates[i] = 0.0
+        elif is_first:
+            prev_xyzw, _ = delta_roll_deg(cur, cur)
+            is_first = False
+            roll_rates[i] = 0.0
+        else:
+            # LOCAL delta rotation -> roll rate, we only care
+            # about the ROLL component for this test
+            prev_xyzw, roll_rates[i] = delta_roll_deg(prev_xyzw, cur)
+    
+    # Branchless deadzone over the whole batch
+    rates = roll_rates[:count]
+    roll_sum = (rates * (np.abs(rates) > deadzone)).sum()
+    
+    return prev_xyzw, is_first, roll_sum
+
+
 def hid_reader():
     """Derives a STABLE local angular velocity from the quaternion stream."""
-    global previous_device_orientation, is_first_frame, stable_local_roll_rate
+    global previous_device_orientation, is_first_frame, stable_local_roll_rate, total_roll
+    
+    # Reports drained per batch, reused for every batch
+    reports = np.zeros((HID_BATCH, 64), dtype=np.uint8)
+    roll_rates = np.zeros(HID_BATCH)
     
     try:
         with hid.Device(path=DEVICE_PATH) as device:
             print("--- Stable Velocity Calibration (Roll Axis) ---")
             while True:
+                # Block for the first report, then drain whatever is buffered
+                count = 0
                 data = device.read(64)
-                if data:
-                    raw_x, raw_y, raw_z, raw_w = [struct.unpack('<h', bytes(data[i:i+2]))[0] for i in range(36, 44, 2)]
-                    scaling_factor = 16384.0
-                    q_x, q_y, q_z, q_w = raw_x/scaling_factor, raw_y/scaling_factor, raw_z/scaling_factor, raw_w/scaling_factor
+                while data:
+                    reports[count, :len(data)] = np.frombuffer(data, dtype=np.uint8)
+                    count += 1
+                    if count == HID_BATCH:
+                        break
+                    data = device.read(64, timeout=0)
+                
+                if count:
+                    previous_device_orientation, is_first_frame, roll_sum = process_reports(
+                        reports, count, previous_device_orientation, is_first_frame, roll_rates, DEADZONE
+                    )
+                    stable_local_roll_rate = roll_rates[count - 1]
                     
-                    try:
-                        # This is our established mapping for the device's axes
-                        input_quat_map = [q_z, q_y, q_x, q_w]
-                        current_device_orientation = R.from_quat(input_quat_map)
-
-                        if is_first_frame:
-                            previous_device_orientation = current_device_orientation
-                            is_first_frame = False
-                        else:
-                            # Calculate the LOCAL delta rotation
-                            delta_local = previous_device_orientation.inv() * current_device_orientation
-                            
-                            # Convert the delta to its Euler angles to get the rates
-                            delta_angles = delta_local.as_euler('zyx', degrees=True)
-                            
-                            # We only care about the ROLL component for this test
-                            stable_local_roll_rate = delta_angles[0]
-                            
-                            previous_device_orientation = current_device_orientation
-                            
-                    except Exception:
-                        is_first_frame = True
-                        stable_local_roll_rate = 0.0
+                    # --- INTEGRATION STEP ---
+                    # Every report's delta is integrated, not just the latest
+                    total_roll += roll_sum * SENSITIVITY_MULTIPLIER
 
     except Exception as e:
         print(f"\nHID Error: {e}.")
@@ -76,14 +161,22 @@ SENSITIVITY_MULTIPLIER = 3.95
 slider_width, slider_x, slider_y = 250, 50, 150
 roll_slider = Slider(screen, slider_x, slider_y, slider_width, 40, min=-360, max=360, handleColour=BLUE)
 
+# Static instructions and labels, rendered once
+TITLE_SURF = font.render(f"Current Multiplier: {SENSITIVITY_MULTIPLIER}", True, WHITE)
+INSTR1_SURF = font.render("1. Lay Deck flat, press ENTER to reset angle to 0.", True, WHITE)
+INSTR2_SURF = font.render("2. Physically roll the Deck 90 degrees.", True, WHITE)
+INSTR3_SURF = font.render("3. Adjust multiplier until the text shows ~90°.", True, WHITE)
+
 # --- 3. Main Application Loop ---
 hid_thread = threading.Thread(target=hid_reader, daemon=True)
 hid_thread.start()
 
 accumulated_roll = 0.0
+roll_offset = 0.0  # total_roll at the last reset
+last_roll_tenths = None
+roll_text = None
 running = True
 while running:
-    # No need for dt here, because the delta_angles are already "per frame"
     clock.tick(60)
     
     events = pygame.event.get()
@@ -93,16 +186,10 @@ while running:
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_RETURN: # Use ENTER key
                 print("Angle reset to zero.")
-                accumulated_roll = 0.0
+                roll_offset = total_roll
 
-    # Apply a deadzone to the calculated rate
-    deadzone = 0.01
-    current_velocity = stable_local_roll_rate if abs(stable_local_roll_rate) > deadzone else 0
-    
-    # --- INTEGRATION STEP ---
-    # We add the scaled, stable velocity to our total.
-    # The rate is already "degrees per frame", so we don't need to multiply by dt.
-    accumulated_roll += current_velocity * SENSITIVITY_MULTIPLIER
+    # The HID thread already applied the deadzone and integrated the rates
+    accumulated_roll = total_roll - roll_offset
 
     # Update the slider
     roll_slider.setValue(accumulated_roll)
@@ -111,17 +198,16 @@ while running:
     screen.fill((20,20,30))
     pygame_widgets.update(events)
     
-    # Instructions and labels
-    title = font.render(f"Current Multiplier: {SENSITIVITY_MULTIPLIER}", True, WHITE)
-    instructions1 = font.render("1. Lay Deck flat, press ENTER to reset angle to 0.", True, WHITE)
-    instructions2 = font.render("2. Physically roll the Deck 90 degrees.", True, WHITE)
-    instructions3 = font.render("3. Adjust multiplier until the text shows ~90°.", True, WHITE)
-    roll_text = font.render(f"Accumulated Roll: {accumulated_roll:.1f}°", True, WHITE)
+    # Only re-render the roll label when the shown value (0.1°) changes
+    roll_tenths = round(accumulated_roll * 10)
+    if roll_tenths != last_roll_tenths:
+        roll_text = font.render(f"Accumulated Roll: {roll_tenths / 10:.1f}°", True, WHITE)
+        last_roll_tenths = roll_tenths
     
-    screen.blit(title, (50, 20))
-    screen.blit(instructions1, (50, 50))
-    screen.blit(instructions2, (50, 80))
-    screen.blit(instructions3, (50, 110))
+    screen.blit(TITLE_SURF, (50, 20))
+    screen.blit(INSTR1_SURF, (50, 50))
+    screen.blit(INSTR2_SURF, (50, 80))
+    screen.blit(INSTR3_SURF, (50, 110))
     screen.blit(roll_text, (slider_x + slider_width + 20, slider_y + 5))
     
     pygame.display.flip()
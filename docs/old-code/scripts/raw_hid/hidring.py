@@ -0,0 +1,133 @@
+"""HID capture daemon, publishing quaternion reports through a shared-memory ring.
+
+Only one process can sensibly read /dev/hidraw2. Run this once and let the UIs
+map the ring read-only instead of opening the device themselves:
+
+    python hidring.py
+
+Layout of the ring file:
+    header  8 bytes   uint64 head, number of records written so far
+    data    SLOTS * RECORD.size bytes, record n lives in slot n & (SLOTS - 1)
+
+Single producer, any number of readers. The producer fills the slot first and
+then bumps head with one aligned 8-byte store, so a reader that sees head == n
+finds record n - 1 complete.
+
+The producer holds an exclusive flock on the ring file for as long as it runs.
+The kernel drops it when the process dies, even on SIGKILL, so readers can tell
+a live ring from one left behind.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import time
+
+import hid
+
+DEVICE_PATH = b"/dev/hidraw2"
+RING_PATH = "/dev/shm/apelios-hidring"
+
+# Timestamp (ns) + quaternion as the device sends it (x, y, z, w as int16)
+RECORD = struct.Struct("<q4h")
+# Power of two, so the slot index is a mask
+SLOTS = 4096
+HEADER_SIZE = 8
+RING_SIZE = HEADER_SIZE + SLOTS * RECORD.size
+
+
+class HidRing:
+    """Read-only view of the ring written by the hidring daemon."""
+
+    def __init__(self, path=RING_PATH):
+        # Kept open to probe the producer's lock
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), RING_SIZE, access=mmap.ACCESS_READ)
+        self._head = memoryview(self._mm)[:HEADER_SIZE].cast("Q")
+        self._last = self._head[0]
+
+    def latest(self):
+        """Return the newest (timestamp_ns, x, y, z, w) record, or None if nothing new arrived."""
+        while True:
+            head = self._head[0]
+            if head == self._last:
+                return None
+            record = RECORD.unpack_from(self._mm, HEADER_SIZE + ((head - 1) & (SLOTS - 1)) * RECORD.size)
+            # The producer starts overwriting this slot once it has published
+            # head - 1 + SLOTS, so anything closer to a lap may be torn
+            if self._head[0] - head < SLOTS - 1:
+                self._last = head
+                return record
+
+    def producer_alive(self):
+        """True while a daemon holds the ring's lock."""
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        return False
+
+    def close(self):
+        self._head.release()
+        self._mm.close()
+        self._file.close()
+
+
+def open_ring(path=RING_PATH):
+    """Return a HidRing if a live daemon publishes at path, else None."""
+    try:
+        ring = HidRing(path)
+    except (FileNotFoundError, ValueError):
+        # No ring, or one the daemon has not sized yet
+        return None
+    if not ring.producer_alive():
+        # Left behind by a daemon that was killed
+        ring.close()
+        return None
+    return ring
+
+
+def run_producer(device_path=DEVICE_PATH, ring_path=RING_PATH):
+    """Read HID reports forever and append their quaternions to the ring."""
+    fd = os.open(ring_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        # Lock before truncating, a running daemon's ring must stay intact
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        raise SystemExit(f"Another hidring daemon already publishes to {ring_path}")
+    # Zero a ring left behind by a killed daemon
+    os.ftruncate(fd, 0)
+    os.ftruncate(fd, RING_SIZE)
+    mm = mmap.mmap(fd, RING_SIZE)
+
+    head_view = memoryview(mm)[:HEADER_SIZE].cast("Q")
+    head = 0
+    try:
+        with hid.Device(path=device_path) as device:
+            print(f"Publishing {device_path.decode()} to {ring_path}")
+            while True:
+                data = device.read(64)
+                if not data:
+                    continue
+                # Bytes 36..43 hold the quaternion as four little-endian int16
+                x, y, z, w = struct.unpack_from("<4h", data, 36)
+                RECORD.pack_into(mm, HEADER_SIZE + (head & (SLOTS - 1)) * RECORD.size,
+                                 time.monotonic_ns(), x, y, z, w)
+                head += 1
+                # Publish only after the slot is complete
+                head_view[0] = head
+    except KeyboardInterrupt:
+        pass
+    finally:
+        head_view.release()
+        mm.close()
+        # Readers fall back to opening the device once the ring is gone
+        os.unlink(ring_path)
+        # Closing the fd releases the lock
+        os.close(fd)
+
+
+if __name__ == "__main__":
+    run_producer()
@@ -1,70 +1,119 @@
+import functools
 import hid
+import math
 import threading
-import struct
+import time
+import numpy as np
 import pygame
-from scipy.spatial.transform import Rotation as R
+from numba import njit
 import pygame_widgets
 from pygame_widgets.slider import Slider
+import hidring
 
 # --- 1. HID Configuration ---
 DEVICE_PATH = b"/dev/hidraw2"
 
-# Global variables for our final, STABLE, local angular velocity
-_stable_local_pitch_rate = 0.0
-_stable_local_yaw_rate   = 0.0
-_stable_local_roll_rate  = 0.0
-_data_lock = threading.Lock()
+# Our final, STABLE, local angular velocity as [pitch, yaw, roll].
+# The HID thread publishes a new array each time and never mutates it, so
+# rebinding the global is an atomic hand-off under the GIL and needs no lock
+_rates = np.zeros(3)
+
+@njit(cache=True, fastmath=True, nogil=True)
+def delta_zyx_deg(px, py, pz, pw, cx, cy, cz, cw):
+    """ZYX Euler angles in degrees of conj(prev) * cur, as scipy's as_euler('zyx')."""
+    # conjugate(prev) * cur
+    dw = pw*cw + px*cx + py*cy + pz*cz
+    dx = pw*cx - px*cw - py*cz + pz*cy
+    dy = pw*cy + px*cz - py*cw - pz*cx
+    dz = pw*cz - px*cy + py*cx - pz*cw
+    a = math.atan2(2.0*(dw*dz - dx*dy), 1.0 - 2.0*(dy*dy + dz*dz))
+    s = 2.0*(dx*dz + dw*dy)
+    if s > 1.0:
+        s = 1.0
+    elif s < -1.0:
+        s = -1.0
+    b = math.asin(s)
+    c = math.atan2(2.0*(dw*dx - dy*dz), 1.0 - 2.0*(dx*dx + dy*dy))
+    return math.degrees(a), math.degrees(b), math.degrees(c)
+
+def quaternion_reports():
+    """Yields raw quaternions (x, y, z, w), from the hidring daemon when it runs, else from the device."""
+    ring = hidring.open_ring()
+    if ring is not None:
+        # Another process owns the device, just follow the shared ring
+        idle_since = None
+        while True:
+            record = ring.latest()
+            if record is not None:
+                idle_since = None
+                yield record[1:]
+                continue
+            # No new record for a while: make sure the daemon is still there
+            now = time.monotonic()
+            if idle_since is None:
+                idle_since = now
+            elif now - idle_since > 1.0:
+                if not ring.producer_alive():
+                    break
+                idle_since = now
+            time.sleep(0.001)
+        ring.close()
+        print("hidring daemon gone, reading the device directly")
+    
+    with hid.Device(path=DEVICE_PATH) as device:
+        while True:
+            data = device.read(64)
+            if not data: continue
+            # Drain whatever else is already queued and keep only the newest
+            # report, the UI samples far slower than the device sends
+            while True:
+                more = device.read(64, timeout=0)
+                if not more: break
+                data = more
+            # Bytes 36..43 hold the quaternion as four little-endian int16 (x, y, z, w)
+            yield np.frombuffer(bytes(data), dtype='<i2', count=4, offset=36).tolist()
 
 def hid_reader_thread():
     """Derives a STABLE local angular velocity (a 'Synthetic Gyro') from the quaternion stream."""
-    global _stable_local_pitch_rate, _stable_local_yaw_rate, _stable_local_roll_rate
+    global _rates
     
-    previous_device_orientation = R.identity()
+    # Previous orientation as plain floats [x, y, z, w]
+    px, py, pz, pw = 0.0, 0.0, 0.0, 1.0
     is_first_frame = True
     
     try:
-        with hid.Device(path=DEVICE_PATH) as device:
-            print("--- Stable Local Angular Velocity Monitor (MVP) ---")
-            while True:
-                data = device.read(64)
-                if not data: continue
-
-                raw_x, raw_y, raw_z, raw_w = [struct.unpack('<h', bytes(data[i:i+2]))[0] for i in range(36, 44, 2)]
-                scaling_factor = 16384.0
-                q_x, q_y, q_z, q_w = raw_x/scaling_factor, raw_y/scaling_factor, raw_z/scaling_factor, raw_w/scaling_factor
-                
-                try:
-                    input_quat_map = [q_z, q_y, q_x, q_w]
-                    current_device_orientation = R.from_quat(input_quat_map)
-
-                    if is_first_frame:
-                        previous_device_orientation = current_device_orientation
-                        is_first_frame = False
-                    else:
-                        delta_local = previous_device_orientation.inv() * current_device_orientation
-                        delta_angles = delta_local.as_euler('zyx', degrees=True)
-                        
-                        SENSITIVITY_MULTIPLIER = 1.0 # Your calibrated value goes here
-                        
-                        with _data_lock:
-                            _stable_local_roll_rate, _stable_local_yaw_rate, _stable_local_pitch_rate = (
-                                delta_angles[0] * SENSITIVITY_MULTIPLIER,
-                                delta_angles[1] * SENSITIVITY_MULTIPLIER,
-                                delta_angles[2] * SENSITIVITY_MULTIPLIER
-                            )
-                        
-                        previous_device_orientation = current_device_orientation
-                        
-                except Exception:
-                    is_first_frame = True
+        print("--- Stable Local Angular Velocity Monitor (MVP) ---")
+        for r0, r1, r2, r3 in quaternion_reports():
+            # Reordered to the [z, y, x, w] axis mapping.
+            # The Q14 scale cancels out in the normalization
+            
+            try:
+                norm = math.sqrt(r0*r0 + r1*r1 + r2*r2 + r3*r3)
+                if norm == 0.0:
+                    raise ValueError("zero norm quaternion")
+                cx, cy, cz, cw = r2 / norm, r1 / norm, r0 / norm, r3 / norm
+
+                if is_first_frame:
+                    px, py, pz, pw = cx, cy, cz, cw
+                    is_first_frame = False
+                else:
+                    roll, yaw, pitch = delta_zyx_deg(px, py, pz, pw, cx, cy, cz, cw)
+                    
+                    SENSITIVITY_MULTIPLIER = 1.0 # Your calibrated value goes here
+                    
+                    _rates = np.array([pitch, yaw, roll]) * SENSITIVITY_MULTIPLIER
+                    
+                    px, py, pz, pw = cx, cy, cz, cw
+                    
+            except Exception:
+                is_first_frame = True
 
     except Exception as e:
         print(f"\nHID Error: {e}.")
 
 def get_local_rotation_rates():
-    """Safely reads the latest rotation rates."""
-    with _data_lock:
-        return (_stable_local_pitch_rate, _stable_local_yaw_rate, _stable_local_roll_rate)
+    """Reads the latest (pitch, yaw, roll) rates, a snapshot the HID thread never modifies."""
+    return _rates
 
 # --- Pygame Setup ---
 pygame.init()
@@ -89,9 +138,26 @@ pitch_slider = Slider(screen, slider_x, slider_y, slider_width, slider_height, m
 yaw_slider   = Slider(screen, slider_x, slider_y + slider_spacing, slider_width, slider_height, min=-5, max=5, handleColour=GREEN)
 roll_slider  = Slider(screen, slider_x, slider_y + slider_spacing * 2, slider_width, slider_height, min=-5, max=5, handleColour=BLUE)
 
+# Loop invariants, computed once instead of every frame
+DEADZONE = 0.05
+TITLE_POS = (slider_x, 30)
+label_x = slider_x + slider_width + 20
+PITCH_LABEL_POS = (label_x, slider_y - 2)
+YAW_LABEL_POS   = (label_x, slider_y + slider_spacing - 2)
+ROLL_LABEL_POS  = (label_x, slider_y + slider_spacing * 2 - 2)
+
+# Static title, rendered once
+TITLE_SURF = font_title.render("Stable Local Angular Velocity (Device Space)", True, WHITE)
+
+@functools.lru_cache(maxsize=256)
+def render_label(text):
+    """Rendered label surfaces, the formatted values repeat across frames."""
+    return font_text.render(text, True, WHITE)
+
 # --- Main Loop ---
 hid_thread = threading.Thread(target=hid_reader_thread, daemon=True)
 hid_thread.start()
+last_labels = None
 running = True
 while running:
     events = pygame.event.get()
@@ -101,33 +167,39 @@ while running:
     
     # Get the clean, local "joystick" rates
     pitch_rate, yaw_rate, roll_rate = get_local_rotation_rates()
-    deadzone = 0.05
-    display_pitch = pitch_rate if abs(pitch_rate) > deadzone else 0
-    display_yaw   = yaw_rate   if abs(yaw_rate)   > deadzone else 0
-    display_roll  = roll_rate  if abs(roll_rate)  > deadzone else 0
-
-    # Update slider values
-    pitch_slider.setValue(display_pitch)
-    yaw_slider.setValue(display_yaw)
-    roll_slider.setValue(display_roll)
-    
-    # --- Drawing ---
-    screen.fill((20,20,30))
-    pygame_widgets.update(events) # Draw the sliders
-    
-    # Draw titles and labels with the smaller font
-    title = font_title.render("Stable Local Angular Velocity (Device Space)", True, WHITE)
-    screen.blit(title, (slider_x, 30))
-    
-    pitch_text = font_text.render(f"Pitch Rate: {display_pitch:5.2f}°/frame", True, WHITE)
-    yaw_text   = font_text.render(f"Yaw Rate:   {display_yaw:5.2f}°/frame", True, WHITE)
-    roll_text  = font_text.render(f"Roll Rate:  {display_roll:5.2f}°/frame", True, WHITE)
+    display_pitch = pitch_rate if abs(pitch_rate) > DEADZONE else 0
+    display_yaw   = yaw_rate   if abs(yaw_rate)   > DEADZONE else 0
+    display_roll  = roll_rate  if abs(roll_rate)  > DEADZONE else 0
     
-    screen.blit(pitch_text, (slider_x + slider_width + 20, slider_y - 2))
-    screen.blit(yaw_text,   (slider_x + slider_width + 20, slider_y + slider_spacing - 2))
-    screen.blit(roll_text,  (slider_x + slider_width + 20, slider_y + slider_spacing * 2 - 2))
+    labels = (
+        f"Pitch Rate: {display_pitch:5.2f}°/frame",
+        f"Yaw Rate:   {display_yaw:5.2f}°/frame",
+        f"Roll Rate:  {display_roll:5.2f}°/frame",
+    )
     
-    pygame.display.flip()
+    # Redraw and flip only when there is input or the shown values changed,
+    # an idle window keeps its last frame
+    if events or labels != last_labels:
+        last_labels = labels
+        
+        # Update slider values
+        pitch_slider.setValue(display_pitch)
+        yaw_slider.setValue(display_yaw)
+        roll_slider.setValue(display_roll)
+        
+        # --- Drawing ---
+        screen.fill((20,20,30))
+        pygame_widgets.update(events) # Draw the sliders
+        
+        # One batched call instead of a blit per surface
+        screen.blits((
+            (TITLE_SURF, TITLE_POS),
+            (render_label(labels[0]), PITCH_LABEL_POS),
+            (render_label(labels[1]), YAW_LABEL_POS),
+            (render_label(labels[2]), ROLL_LABEL_POS),
+        ), doreturn=False)
+        
+        pygame.display.flip()
     clock.tick(60)
 
 pygame.quit()
\ No newline at end of file
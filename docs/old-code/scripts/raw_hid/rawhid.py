@@ -3,6 +3,9 @@ import hid
 # Specify the HID device path
 DEVICE_PATH = b"/dev/hidraw2"  # Note the b prefix for bytes
 
+# Byte index header printed above every report
+HEADER = ' '.join(f"{i:02d}" for i in range(64))
+
 def read_hid_device():
     try:
         # Open the HID device
@@ -15,9 +18,9 @@ def read_hid_device():
                     # Convert byte data to a readable format
                     # print("Data received:", data)i 
                     # If you want to decode it further
-                    hex_data = ' '.join(format(x, '02x') for x in data)
+                    hex_data = bytes(data).hex(' ')
                     print()
-                    print("00 01 02 03 04 05 06 07 08 09 10 11 12 13 14 15 16 17 18 19 20 21 22 23 24 25 26 27 28 29 30 31 32 33 34 35 36 37 38 39 40 41 42 43 44 45 46 47 48 49 50 51 52 53 54 55 56 57 58 59 60 61 62 63")
+                    print(HEADER)
                     print(hex_data)
     except Exception as e:
         print("Error:", e)
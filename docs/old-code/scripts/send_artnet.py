@@ -24,6 +24,11 @@ async def send_dmx_changes(universe: ArtNetUniverse):
     
     # Create a 512-byte array for our DMX data
     dmx_data = bytearray(512)
+    
+    # Immutable snapshot handed to set_dmx, only rebuilt when dmx_data changed.
+    # set_dmx takes bytes and may hold on to it, so a live view of the
+    # mutable buffer is not safe to pass.
+    dmx_immut = bytes(512)
     value = 0
     direction = 1
 
@@ -34,7 +39,9 @@ async def send_dmx_changes(universe: ArtNetUniverse):
             
             # Set the DMX data for the universe
             # This automatically sends it to all subscribers
-            universe.set_dmx(bytes(dmx_data))
+            if dmx_data != dmx_immut:
+                dmx_immut = bytes(dmx_data)
+            universe.set_dmx(dmx_immut)
             
             # Update the value for the next loop
             value += direction
@@ -1,27 +1,70 @@
 import argparse
 import asyncio
+import json
 import logging
+import os
+import sys
 import time
 import threading
-from queue import Queue
+import traceback
+from collections import deque
 
 import cv2
 import numpy as np
-from aiohttp import ClientSession, ClientTimeout
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
 from aiortc import RTCPeerConnection, RTCSessionDescription
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from display import open_video_window
+
+# orjson is optional, the wire format is the same either way
+try:
+    import orjson
+    json_loads = orjson.loads
+    def json_dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads, json_dumps = json.loads, json.dumps
+
+
+# Smoothing factor for the frame interval / latency averages
+EMA_ALPHA = 0.1
+
 
 class VideoReceiver:
     """Receives and displays video stream from WebRTC sender"""
     
-    def __init__(self, sender_url: str):
+    def __init__(self, sender_url: str, max_latency_ms: float = 100.0):
         self.sender_url = sender_url
+        self.max_latency = max_latency_ms / 1000.0
         self.pc = None
+        # HTTP session shared by all connection attempts, created on first connect
+        self.http = None
         self.frame_count = 0
         self.start_time = None
-        self.frame_queue = Queue(maxsize=2)  # Small queue for low latency
+        # Only the latest frame: a deeper queue would smooth out bursty
+        # arrival, but every queued frame adds a frame period of latency
+        # deque(maxlen=1) drops the stale frame by itself and append/popleft
+        # are atomic; the event wakes the display
+        self.frames = deque(maxlen=1)
+        self.frame_event = threading.Event()
         self.running = False
         self.connected = False
+        # Published by the display thread (plain float stores, no lock needed)
+        self.display_dt = 0.0
+        self.display_latency = 0.0
+        self.dropped_frames = 0
+        self._drop_accum = 0.0
+        # Reused BGR output buffers: one being filled, one queued and one on
+        # screen. The converter picks the buffer that is neither queued nor
+        # the one the display last popped, however far the display lags.
+        # The lock makes popping and marking the displayed buffer one step
+        self._bgr_buffers = []
+        self._displayed = None
+        self._buffer_lock = threading.Lock()
+        # Pre-rendered info overlay, redrawn only when its text changes
+        self._overlay = None
+        self._overlay_dirty = True
         
     async def connect(self):
         """Connect to the sender and start receiving video"""
@@ -61,22 +104,27 @@ class VideoReceiver:
         
         # Send offer to sender
         try:
-            async with ClientSession() as session:
-                async with session.post(
-                    f"{self.sender_url}/offer",
-                    json={
-                        "sdp": self.pc.localDescription.sdp,
-                        "type": self.pc.localDescription.type
-                    },
-                    timeout=ClientTimeout(total=10)
-                ) as response:
-                    if response.status != 200:
-                        raise Exception(f"HTTP error {response.status}")
-                    
-                    answer = await response.json()
-                    await self.pc.setRemoteDescription(
-                        RTCSessionDescription(sdp=answer["sdp"], type=answer["type"])
-                    )
+            if self.http is None or self.http.closed:
+                # One kept-alive connection to the sender, reused on reconnect
+                self.http = ClientSession(
+                    connector=TCPConnector(limit=1, keepalive_timeout=30),
+                    json_serialize=json_dumps,
+                )
+            async with self.http.post(
+                f"{self.sender_url}/offer",
+                json={
+                    "sdp": self.pc.localDescription.sdp,
+                    "type": self.pc.localDescription.type
+                },
+                timeout=ClientTimeout(total=10)
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"HTTP error {response.status}")
+                
+                answer = await response.json(loads=json_loads)
+                await self.pc.setRemoteDescription(
+                    RTCSessionDescription(sdp=answer["sdp"], type=answer["type"])
+                )
         except Exception as e:
             print(f"Failed to connect to sender: {e}")
             await self.close()
@@ -85,27 +133,44 @@ class VideoReceiver:
     async def receive_video(self, track):
         """Receive video frames and put them in queue"""
         self.running = True
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
         
         print("Starting video reception...")
         
+        incoming_dt = 0.0
+        last_recv = None
+        
         try:
             while self.running:
                 try:
                     # Receive frame with timeout
                     frame = await asyncio.wait_for(track.recv(), timeout=5.0)
+                    now = time.monotonic()
+                    if last_recv is not None:
+                        dt = now - last_recv
+                        incoming_dt = dt if incoming_dt == 0.0 else incoming_dt + EMA_ALPHA * (dt - incoming_dt)
+                    last_recv = now
                     
-                    # Convert to numpy array
-                    img = frame.to_ndarray(format="bgr24")
+                    # Admission control: once the display lags behind, drop the
+                    # share of frames it cannot keep up with before converting them
+                    display_dt = self.display_dt
+                    if self.display_latency > self.max_latency and display_dt > 0.0 and incoming_dt > 0.0:
+                        target_drop = max(0.0, 1.0 - incoming_dt / display_dt)
+                        self._drop_accum += target_drop
+                        if self._drop_accum >= 1.0:
+                            self._drop_accum -= 1.0
+                            self.dropped_frames += 1
+                            del frame
+                            continue
+                    else:
+                        self._drop_accum = 0.0
                     
-                    # Put in queue (drop old frames if queue is full)
-                    if self.frame_queue.full():
-                        try:
-                            self.frame_queue.get_nowait()
-                        except:
-                            pass
+                    # Convert to numpy array
+                    img = self._to_bgr(frame)
                     
-                    self.frame_queue.put(img)
+                    # Replaces the queued frame, if the display has not taken it yet
+                    self.frames.append((img, now))
+                    self.frame_event.set()
                     self.frame_count += 1
                         
                 except asyncio.TimeoutError:
@@ -118,41 +183,66 @@ class VideoReceiver:
                     break
                     
         finally:
-            print(f"Stopped receiving video. Total frames: {self.frame_count}")
+            print(f"Stopped receiving video. Total frames: {self.frame_count}, dropped: {self.dropped_frames}")
     
     def display_loop(self):
         """Display frames in OpenCV window (runs in main thread)"""
         print("Opening display window...")
         window_name = 'WebRTC Stream'
-        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+        open_video_window(window_name)
         
-        fps_time = time.time()
+        fps_time = time.monotonic()
         fps_frames = 0
         current_fps = 0
+        last_get = None
+        frame_shape = None
+        # Bound locally, the loop runs once per frame
+        imshow = cv2.imshow
+        poll_key = cv2.pollKey
         
-        while self.running or not self.frame_queue.empty():
+        while self.running or self.frames:
             try:
-                # Get frame from queue with timeout
-                img = self.frame_queue.get(timeout=0.1)
+                # Wait for a frame with timeout
+                self.frame_event.wait(0.1)
+                self.frame_event.clear()
+                with self._buffer_lock:
+                    img, received = self.frames.popleft()
+                    self._displayed = img
+                
+                # Publish display interval and receive-to-display latency
+                now = time.monotonic()
+                if last_get is not None:
+                    dt = now - last_get
+                    self.display_dt = dt if self.display_dt == 0.0 else self.display_dt + EMA_ALPHA * (dt - self.display_dt)
+                last_get = now
+                latency = now - received
+                self.display_latency += EMA_ALPHA * (latency - self.display_latency)
                 
                 # Calculate FPS
                 fps_frames += 1
-                elapsed = time.time() - fps_time
+                elapsed = now - fps_time
                 if elapsed >= 1.0:
                     current_fps = fps_frames / elapsed
                     fps_frames = 0
-                    fps_time = time.time()
+                    fps_time = now
+                    self._overlay_dirty = True
+                if img.shape != frame_shape:
+                    frame_shape = img.shape
+                    self._overlay_dirty = True
                 
-                # Add info overlay
-                info_text = f"FPS: {current_fps:.1f} | Frame: {self.frame_count} | {img.shape[1]}x{img.shape[0]}"
-                cv2.putText(img, info_text, (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                # Add info overlay: the text only changes once per second, so
+                # rasterize it then and just copy the pixels in per frame
+                if self._overlay_dirty:
+                    self._render_overlay(f"FPS: {current_fps:.1f} | Frame: {self.frame_count} | {img.shape[1]}x{img.shape[0]}")
+                oh = min(self._overlay.shape[0], img.shape[0])
+                ow = min(self._overlay.shape[1], img.shape[1])
+                img[:oh, :ow] = self._overlay[:oh, :ow]
                 
                 # Display
-                cv2.imshow(window_name, img)
+                imshow(window_name, img)
                 
-                # Check for exit key
-                key = cv2.waitKey(1) & 0xFF
+                # Check for exit key (pollKey does not sleep like waitKey)
+                key = poll_key() & 0xFF
                 if key == ord('q'):
                     print("\nStopping (pressed 'q')...")
                     self.running = False
@@ -174,6 +264,49 @@ class VideoReceiver:
         cv2.destroyAllWindows()
         print("Display window closed")
     
+    def _to_bgr(self, frame):
+        """Convert a decoded frame to BGR in one of the reused output buffers"""
+        if frame.format.name != "yuv420p":
+            return frame.to_ndarray(format="bgr24")
+        # The decoders hand out planar YUV: copy the planes out packed and let
+        # OpenCV's I420 kernel convert them instead of the generic swscale path
+        i420 = frame.to_ndarray()
+        shape = (frame.height, frame.width, 3)
+        if not self._bgr_buffers or self._bgr_buffers[0].shape != shape:
+            self._bgr_buffers = [np.empty(shape, dtype=np.uint8) for _ in range(3)]
+        with self._buffer_lock:
+            queued = self.frames[0][0] if self.frames else None
+            img = next(b for b in self._bgr_buffers if b is not queued and b is not self._displayed)
+        cv2.cvtColor(i420, cv2.COLOR_YUV2BGR_I420, dst=img)
+        return img
+    
+    def _pin_threads(self, display_thread):
+        """Give the display thread its own core so imshow does not compete with the event loop (Linux only)"""
+        if not sys.platform.startswith('linux'):
+            return
+        cpu_count = os.cpu_count() or 1
+        if cpu_count < 2:
+            return
+        try:
+            os.sched_setaffinity(display_thread.native_id, {cpu_count - 1})
+            # pid 0 is the calling thread, i.e. the one running the event loop
+            os.sched_setaffinity(0, range(cpu_count - 1))
+        except OSError as e:
+            print(f"Could not set CPU affinity: {e}")
+        try:
+            os.setpriority(os.PRIO_PROCESS, display_thread.native_id, -5)
+        except PermissionError:
+            # Raising priority needs CAP_SYS_NICE, run unprivileged at default priority
+            pass
+    
+    def _render_overlay(self, info_text):
+        """Rasterize the info text into the cached overlay"""
+        (text_w, _), _ = cv2.getTextSize(info_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        self._overlay = np.zeros((40, text_w + 20, 3), dtype=np.uint8)
+        cv2.putText(self._overlay, info_text, (10, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        self._overlay_dirty = False
+    
     async def close(self):
         """Close the connection"""
         self.running = False
@@ -190,6 +323,7 @@ class VideoReceiver:
             # Start display loop in separate thread
             display_thread = threading.Thread(target=self.display_loop, daemon=True)
             display_thread.start()
+            self._pin_threads(display_thread)
             
             # Wait for connection
             while not self.connected and self.pc and self.pc.connectionState not in ["closed", "failed"]:
@@ -210,10 +344,12 @@ class VideoReceiver:
             print("\nStopped by user")
         except Exception as e:
             print(f"Error: {e}")
-            import traceback
             traceback.print_exc()
         finally:
             await self.close()
+            if self.http:
+                await self.http.close()
+                self.http = None
 
 
 async def main():
@@ -223,6 +359,12 @@ async def main():
         default="http://192.168.8.144:8080",
         help="Sender URL (default: http://192.168.8.144:8080)"
     )
+    parser.add_argument(
+        "--max-latency-ms",
+        type=float,
+        default=100.0,
+        help="Start dropping frames once display latency exceeds this (default: 100)"
+    )
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose logging")
     
     args = parser.parse_args()
@@ -240,11 +382,17 @@ async def main():
     print("Press 's' to save screenshot")
     print("=" * 60)
     
-    receiver = VideoReceiver(args.sender)
+    receiver = VideoReceiver(args.sender, max_latency_ms=args.max_latency_ms)
     await receiver.run()
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
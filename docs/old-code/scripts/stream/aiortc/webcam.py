@@ -4,7 +4,9 @@ import json
 import logging
 import os
 import platform
+import signal
 import ssl
+import sys
 from typing import Optional
 
 from aiohttp import web
@@ -13,20 +15,61 @@ from aiortc import (
     RTCPeerConnection,
     RTCRtpSender,
     RTCSessionDescription,
+    VideoStreamTrack,
 )
 from aiortc.contrib.media import MediaPlayer, MediaRelay
+from aiortc.mediastreams import MediaStreamError
+from av import VideoFrame
+
+# orjson is optional, the wire format is the same either way
+try:
+    import orjson
+    json_loads = orjson.loads
+    def json_dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads, json_dumps = json.loads, json.dumps
 
 ROOT = os.path.dirname(__file__)
 
-pcs = set()
+pcs: set[RTCPeerConnection] = set()
 relay = None
 webcam = None
+camera_track = None
+
+# Set with --workers: the capture process all workers read from, and this
+# worker's consumer index
+shared_capture = None
+worker_index = 0
+
+
+class SharedCaptureTrack(VideoStreamTrack):
+    """Video track fed by this worker's reads from the shared capture process."""
+
+    def __init__(self, capture, consumer: int) -> None:
+        super().__init__()
+        self._capture = capture
+        self._consumer = consumer
+
+    async def recv(self) -> VideoFrame:
+        pts, time_base = await self.next_timestamp()
+        ok, frame = await asyncio.get_running_loop().run_in_executor(
+            None, self._capture.read, 1.0, self._consumer
+        )
+        if not ok:
+            self.stop()
+            raise MediaStreamError
+        # from_ndarray copies, the shared memory slot is free again after this
+        video_frame = VideoFrame.from_ndarray(frame, format="bgr24")
+        video_frame.pts = pts
+        video_frame.time_base = time_base
+        return video_frame
 
 
 def create_local_tracks(
     play_from: str, decode: bool
 ) -> tuple[Optional[MediaStreamTrack], Optional[MediaStreamTrack]]:
-    global relay, webcam
+    global relay, webcam, camera_track
 
     if play_from:
         # If a file name was given, play from that file.
@@ -40,7 +83,10 @@ def create_local_tracks(
         # to stop the webcam when the application shuts down in `on_shutdown`.
         options = {"framerate": "30", "video_size": "640x480"}
         if relay is None:
-            if platform.system() == "Darwin":
+            if shared_capture is not None:
+                # --workers: the camera is opened once, by the capture process
+                camera_track = SharedCaptureTrack(shared_capture, worker_index)
+            elif platform.system() == "Darwin":
                 webcam = MediaPlayer(
                     "default:none", format="avfoundation", options=options
                 )
@@ -50,8 +96,10 @@ def create_local_tracks(
                 )
             else:
                 webcam = MediaPlayer("/dev/video2", format="v4l2", options=options)
+            if webcam is not None:
+                camera_track = webcam.video
             relay = MediaRelay()
-        return None, relay.subscribe(webcam.video)
+        return None, relay.subscribe(camera_track)
 
 
 def force_codec(pc: RTCPeerConnection, sender: RTCRtpSender, forced_codec: str) -> None:
@@ -74,7 +122,7 @@ async def javascript(request: web.Request) -> web.Response:
 
 
 async def offer(request: web.Request) -> web.Response:
-    params = await request.json()
+    params = await request.json(loads=json_loads)
     offer = RTCSessionDescription(sdp=params["sdp"], type=params["type"])
 
     pc = RTCPeerConnection()
@@ -113,21 +161,22 @@ async def offer(request: web.Request) -> web.Response:
 
     return web.Response(
         content_type="application/json",
-        text=json.dumps(
+        text=json_dumps(
             {"sdp": pc.localDescription.sdp, "type": pc.localDescription.type}
         ),
     )
 
 
 async def on_shutdown(app: web.Application) -> None:
-    # Close peer connections.
-    coros = [pc.close() for pc in pcs]
-    await asyncio.gather(*coros)
-    pcs.clear()
+    # Close peer connections. Iterate a snapshot, connection state handlers
+    # discard from pcs while the closes are awaited.
+    peers = tuple(pcs)
+    await asyncio.gather(*(pc.close() for pc in peers), return_exceptions=True)
+    pcs.difference_update(peers)
 
     # If a shared webcam was opened, stop it.
-    if webcam is not None:
-        webcam.video.stop()
+    if camera_track is not None:
+        camera_track.stop()
 
 
 if __name__ == "__main__":
@@ -156,9 +205,22 @@ if __name__ == "__main__":
     parser.add_argument(
         "--video-codec", help="Force a specific video codec (e.g. video/H264)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Number of server processes sharing the port via SO_REUSEPORT, "
+            "each with its own event loop (Linux). Without --play-from the "
+            "webcam is captured once and shared through shared memory"
+        ),
+    )
 
     args = parser.parse_args()
 
+    if args.workers > 1 and not hasattr(os, "fork"):
+        parser.error("--workers > 1 is only supported on Linux")
+
     if args.verbose:
         logging.basicConfig(level=logging.DEBUG)
     else:
@@ -175,4 +237,54 @@ if __name__ == "__main__":
     app.router.add_get("/", index)
     app.router.add_get("/client.js", javascript)
     app.router.add_post("/offer", offer)
-    web.run_app(app, host=args.host, port=args.port, ssl_context=ssl_context)
\ No newline at end of file
+
+    if args.workers > 1 and not args.play_from:
+        # The webcam device can only be opened by one process: capture it
+        # once and let every worker read the frames from shared memory
+        sys.path.insert(0, os.path.dirname(ROOT))
+        from shm_capture import HELD_SLOTS, SharedMemoryCapture
+
+        shared_capture = SharedMemoryCapture(
+            "/dev/video2", 640, 480, 30,
+            slots=HELD_SLOTS * args.workers + 2, consumers=args.workers,
+        )
+        if not shared_capture.open():
+            sys.exit("Cannot open the webcam")
+
+    # Fork the extra workers before any event loop exists; the kernel then
+    # spreads incoming connections over the processes bound to the port
+    children = []
+    for i in range(1, args.workers):
+        pid = os.fork()
+        if pid == 0:
+            worker_index = i
+            children = []
+            break
+        children.append(pid)
+
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
+    try:
+        web.run_app(
+            app,
+            host=args.host,
+            port=args.port,
+            ssl_context=ssl_context,
+            reuse_port=args.workers > 1,
+        )
+    finally:
+        # run_app returns on SIGINT/SIGTERM; pass the signal on to the other
+        # workers and reap them, so none keeps serving the port on its own
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            os.waitpid(pid, 0)
+        if shared_capture is not None and worker_index == 0:
+            shared_capture.release()
\ No newline at end of file
@@ -0,0 +1,14 @@
+"""OpenCV window setup shared by the stream scripts."""
+import cv2
+
+
+def open_video_window(window_name):
+    """Create an OpenGL window without VSYNC, so imshow is not clamped to the refresh rate.
+
+    Falls back to a normal window when OpenCV is built without OpenGL support.
+    """
+    try:
+        cv2.namedWindow(window_name, cv2.WINDOW_OPENGL)
+        cv2.setWindowProperty(window_name, cv2.WND_PROP_VSYNC, 0)
+    except cv2.error:
+        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
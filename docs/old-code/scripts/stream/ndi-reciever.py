@@ -1,11 +1,14 @@
 import cv2
+import sys
 import time
-import numpy as np
+import traceback
 from cyndilib.finder import Finder
 from cyndilib.receiver import Receiver
 from cyndilib.wrapper.ndi_recv import RecvColorFormat, RecvBandwidth
 from cyndilib.video_frame import VideoFrameSync
 
+from display import open_video_window
+
 # Configuration
 SOURCE_NAME = "Moving Head Camera"
 
@@ -18,13 +21,8 @@ try:
     finder.open()
     
     print("Waiting for sources (this may take a few seconds)...")
-    # Try multiple times to find sources
-    for attempt in range(3):
-        found = finder.wait_for_sources(timeout=5)
-        if found:
-            break
-        print(f"Attempt {attempt + 1}/3: No sources found yet...")
-        time.sleep(1)
+    # One blocking wait, returns as soon as the first source shows up
+    finder.wait_for_sources(timeout=15)
     
     # Get source names
     source_names = finder.get_source_names()
@@ -67,13 +65,19 @@ try:
     receiver.set_source(target_source)
     
     # Wait for connection
+    # cyndilib has no connection callback, so poll with a short interval
+    # against a deadline instead of a fixed number of 0.1s sleeps
     print("Waiting for connection...")
-    for i in range(50):
-        if receiver.is_connected():
+    connect_start = time.monotonic()
+    next_notice = connect_start + 1.0
+    while not receiver.is_connected():
+        now = time.monotonic()
+        if now - connect_start > 5.0:
             break
-        time.sleep(0.1)
-        if i % 10 == 0:
-            print(f"Still waiting... ({i/10:.0f}s)")
+        if now >= next_notice:
+            print(f"Still waiting... ({now - connect_start:.0f}s)")
+            next_notice += 1.0
+        time.sleep(0.05)
     
     if not receiver.is_connected():
         print("Failed to connect!")
@@ -83,6 +87,10 @@ try:
     
     frame_count = 0
     start_time = None
+    last_log = 0.0
+    
+    window_name = 'NDI Stream'
+    open_video_window(window_name)
     
     print("Waiting for frames...")
     while receiver.is_connected():
@@ -94,36 +102,38 @@ try:
             # Get frame as numpy array
             frame_array = vf.get_array()
             
-            # Convert BGRA to BGR
-            frame_bgr = cv2.cvtColor(frame_array, cv2.COLOR_BGRA2BGR)
-            
-            # Display
-            cv2.imshow('NDI Stream', frame_bgr)
+            # Display the BGRX frame as is: imshow takes 4-channel images and
+            # ignores the fourth byte. A [..., :3] view would still be copied,
+            # a 3-channel Mat cannot have a pixel stride of 4
+            cv2.imshow(window_name, frame_array)
             
+            # One clock read per frame, monotonic so wall clock jumps do not skew FPS
+            now = time.monotonic()
             frame_count += 1
             if frame_count == 1:
                 print(f"Receiving {vf.xres}x{vf.yres}")
-                start_time = time.time()
+                start_time = now
+                last_log = now
             
-            if frame_count % 30 == 0 and start_time:
-                elapsed = time.time() - start_time
-                fps = frame_count / elapsed
-                print(f"Received {frame_count} frames | FPS: {fps:.1f}", end='\r')
+            # Stats at most twice a second, terminal writes can stall the loop
+            if now - last_log > 0.5 and start_time:
+                fps = frame_count / (now - start_time)
+                sys.stdout.write(f"Received {frame_count} frames | FPS: {fps:.1f}\r")
+                sys.stdout.flush()
+                last_log = now
             
-            # Exit on 'q'
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            # Exit on 'q' (pollKey does not sleep like waitKey)
+            if cv2.pollKey() & 0xFF == ord('q'):
                 break
         else:
             # Wait a bit if no valid frame received yet
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if cv2.waitKey(10) & 0xFF == ord('q'):
                 break
-            time.sleep(0.01)
 
 except KeyboardInterrupt:
     print("\n\nStopping receiver...")
 except Exception as e:
     print(f"\nError: {e}")
-    import traceback
     traceback.print_exc()
 finally:
     finder.close()
@@ -1,16 +1,30 @@
 import cv2
+import sys
 import time
 import numpy as np
 from fractions import Fraction
 from cyndilib.wrapper.ndi_structs import FourCC
 from cyndilib.video_frame import VideoSendFrame
 from cyndilib.sender import Sender
+from shm_capture import SharedMemoryCapture
 
 # Configuration
 SENDER_NAME = "Moving Head Camera"
 WIDTH, HEIGHT = 640, 480  # Lower resolution for testing
 FPS = 30
 
+# Open camera in a separate capture process, frames arrive through shared memory.
+# Ask V4L2 for raw YUYV so OpenCV does no color conversion at all
+cap = SharedMemoryCapture(0, WIDTH, HEIGHT, FPS, fourcc='YUYV')
+if not cap.open():
+    print("Failed to open camera")
+    exit()
+
+native_yuyv = cap.fourcc == cv2.VideoWriter_fourcc(*'YUYV')
+if not native_yuyv:
+    # Camera cannot deliver YUYV, the capture process falls back to BGR frames
+    print("Camera does not support YUYV, falling back to BGRX")
+
 # Create sender
 sender = Sender(SENDER_NAME)
 
@@ -18,29 +32,28 @@ sender = Sender(SENDER_NAME)
 vf = VideoSendFrame()
 vf.set_resolution(WIDTH, HEIGHT)
 vf.set_frame_rate(Fraction(FPS, 1))
-vf.set_fourcc(FourCC.BGRX)
+vf.set_fourcc(FourCC.UYVY if native_yuyv else FourCC.BGRX)
 
 # Set video frame on sender
 sender.set_video_frame(vf)
 
-# Open camera
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, WIDTH)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, HEIGHT)
-cap.set(cv2.CAP_PROP_FPS, FPS)
-cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-if not cap.isOpened():
-    print("Failed to open camera")
-    exit()
-
 print(f"NDI Sender '{SENDER_NAME}' started")
 print(f"Streaming at {WIDTH}x{HEIGHT} @ {FPS}fps")
 print("Press Ctrl+C to stop")
 print("\nWaiting 3 seconds for NDI registration...")
 
+# Persistent BGRX buffer filled in place by cvtColor, plus a flat view of it
+# for the sender (created once, so no per-frame ravel)
+frame_bgrx = np.empty((HEIGHT, WIDTH, 4), dtype=np.uint8)
+frame_bgrx_flat = frame_bgrx.reshape(-1)
+
+# Two UYVY buffers, alternated: the async send may still read the previous one
+frames_uyvy = [None, None]
+uyvy_index = 0
+
 frame_count = 0
-start_time = time.time()
+start_time = time.monotonic()
+last_log = 0.0
 
 try:
     # Keep sender open with context manager
@@ -56,17 +69,32 @@ try:
             print("Failed to read frame")
             break
         
-        # Convert BGR to BGRX (add alpha channel)
-        frame_bgrx = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
-        
-        # Send the frame
-        sender.write_video_async(frame_bgrx.ravel())
+        if native_yuyv:
+            # YUYV -> UYVY is just swapping the bytes of each 16-bit pair.
+            # Swapped into our own buffer, never in the shared memory slot:
+            # read() can hand out the same slot twice, a second in-place
+            # swap would turn it back into YUYV
+            yuyv = frame.reshape(-1)
+            uyvy = frames_uyvy[uyvy_index]
+            if uyvy is None or uyvy.shape != yuyv.shape:
+                uyvy = frames_uyvy[uyvy_index] = np.empty_like(yuyv)
+            uyvy[0::2] = yuyv[1::2]
+            uyvy[1::2] = yuyv[0::2]
+            sender.write_video_async(uyvy)
+            uyvy_index ^= 1
+        else:
+            # Convert BGR to BGRX into the persistent buffer
+            cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA, dst=frame_bgrx)
+            sender.write_video_async(frame_bgrx_flat)
         
         frame_count += 1
-        if frame_count % 30 == 0:
-            elapsed = time.time() - start_time
-            fps = frame_count / elapsed
-            print(f"Sent {frame_count} frames | FPS: {fps:.1f}", end='\r')
+        # Stats at most twice a second, terminal writes can stall the loop
+        now = time.monotonic()
+        if now - last_log > 0.5:
+            fps = frame_count / (now - start_time)
+            sys.stdout.write(f"Sent {frame_count} frames | FPS: {fps:.1f}\r")
+            sys.stdout.flush()
+            last_log = now
 
 except KeyboardInterrupt:
     print("\n\nStopping sender...")
@@ -1,5 +1,7 @@
 import cv2
 
+from display import open_video_window
+
 # RTSP stream URL (replace with your stream)
 RTSP_URL = "rtsp://localhost:8554/stream"
 
@@ -19,6 +21,9 @@ if not cap.isOpened():
 print(f"Connected to {RTSP_URL}")
 print("Press 'q' to quit")
 
+window_name = 'RTSP Stream'
+open_video_window(window_name)
+
 # Main loop
 while True:
     ret, frame = cap.read()
@@ -28,10 +33,10 @@ while True:
         break
     
     # Display the frame
-    cv2.imshow('RTSP Stream', frame)
+    cv2.imshow(window_name, frame)
     
-    # Exit on 'q' key
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    # Exit on 'q' key (pollKey does not sleep like waitKey)
+    if cv2.pollKey() & 0xFF == ord('q'):
         break
 
 # Cleanup
@@ -1,29 +1,40 @@
 import cv2
+import numpy as np
+import queue
 import subprocess
 import sys
+import threading
+
+from shm_capture import SharedMemoryCapture
 
 RTSP_URL = "rtsp://192.168.8.144:8554/stream"
 WIDTH, HEIGHT = 640, 480
 FPS = 30
+FRAME_BYTES = WIDTH * HEIGHT * 2  # YUYV is 2 bytes per pixel
 
-# Open camera
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, WIDTH)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, HEIGHT)
-cap.set(cv2.CAP_PROP_FPS, FPS)
-cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+# Open camera in a separate capture process, frames arrive through shared memory.
+# Hand the camera's native YUYV to ffmpeg untouched: no YUV->BGR in OpenCV
+# and no BGR->YUV in ffmpeg before the encoder.
+cap = SharedMemoryCapture(0, WIDTH, HEIGHT, FPS, fourcc='YUYV')
 
-if not cap.isOpened():
+if not cap.open():
     print("Error: Cannot open camera")
     sys.exit(1)
+if cap.fourcc != cv2.VideoWriter_fourcc(*'YUYV'):
+    print("Error: Camera does not support YUYV")
+    cap.release()
+    sys.exit(1)
 
 # FFmpeg command
 ffmpeg_cmd = [
     'ffmpeg',
     '-y',
+    # Frames are pushed at capture rate, nothing to gain from input buffering
+    '-fflags', 'nobuffer',
+    '-flags', 'low_delay',
     '-f', 'rawvideo',
     '-vcodec', 'rawvideo',
-    '-pix_fmt', 'bgr24',
+    '-pix_fmt', 'yuyv422',
     '-s', f'{WIDTH}x{HEIGHT}',
     '-r', str(FPS),
     '-i', '-',
@@ -35,6 +46,7 @@ ffmpeg_cmd = [
     '-bufsize', '500k',
     '-g', str(FPS),
     '-pix_fmt', 'yuv420p',
+    '-vsync', 'vfr',
     '-f', 'rtsp',
     RTSP_URL
 ]
@@ -42,27 +54,82 @@ ffmpeg_cmd = [
 print(f"Streaming to {RTSP_URL}")
 print("Press Ctrl+C to stop")
 
-process = subprocess.Popen(ffmpeg_cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+# Pipe buffer sized to one frame, so each frame goes out in a single write
+process = subprocess.Popen(ffmpeg_cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=FRAME_BYTES)
 
-try:
+# Frames go to ffmpeg from a separate thread so a stalled encoder never
+# blocks the capture loop; when it falls behind the oldest frame is dropped
+# Frames are copied out of the shared memory ring into buffers owned by the
+# writer side, so a slow ffmpeg can never see a ring slot the capture process
+# is already refilling. The pool bounds writer_q: at most two queued frames
+# plus one being written
+WRITE_BUFFERS = 3
+free_bufs = queue.SimpleQueue()
+writer_q = queue.Queue()
+writer_failed = threading.Event()
+
+
+def ffmpeg_writer():
     while True:
+        buf = writer_q.get()
+        if buf is None:
+            break
+        try:
+            process.stdin.write(buf)
+        except (BrokenPipeError, ValueError):
+            writer_failed.set()
+            break
+        free_bufs.put(buf)
+
+
+writer_thread = threading.Thread(target=ffmpeg_writer, daemon=True)
+writer_thread.start()
+dropped = 0
+pool_ready = False
+
+try:
+    while not writer_failed.is_set():
         ret, frame = cap.read()
         if not ret:
             print("Error: Failed to read frame")
             break
         
-        if process.stdin:
-            process.stdin.write(frame.tobytes())
-        else:
-            print("Error: FFmpeg stdin closed")
-            break
+        if not pool_ready:
+            # Size the pool from what the camera delivers
+            for _ in range(WRITE_BUFFERS):
+                free_bufs.put(np.empty_like(frame))
+            pool_ready = True
+        
+        try:
+            buf = free_bufs.get_nowait()
+        except queue.Empty:
+            try:
+                # ffmpeg is behind: drop the oldest queued frame, reuse its buffer
+                buf = writer_q.get_nowait()
+                dropped += 1
+                print(f"Dropped {dropped} frames (ffmpeg behind)", end='\r')
+            except queue.Empty:
+                # The writer just took the queued frames, a buffer is on its way
+                # back unless the writer died holding it
+                try:
+                    buf = free_bufs.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+        
+        np.copyto(buf, frame)
+        writer_q.put_nowait(buf)
+    
+    if writer_failed.is_set():
+        print("FFmpeg process died")
         
 except KeyboardInterrupt:
     print("\nStopping...")
-except BrokenPipeError:
-    print("FFmpeg process died")
 finally:
     cap.release()
+    if not writer_failed.is_set():
+        # Let the writer drain and exit before closing the pipe
+        writer_q.put(None)
+        writer_thread.join(timeout=2.0)
     if process.stdin:
         process.stdin.close()
     process.terminate()
@@ -0,0 +1,173 @@
+"""Camera capture in its own process, frames handed over through shared memory.
+
+The capture process reads into a ring of frame slots inside a SharedMemory
+block and publishes the index of the newest one; the consumer reads that slot
+in place. Nothing is pickled per frame and the capture never competes with the
+sender for the GIL.
+
+Each consumer checks out the slots of its last two reads and the capture skips
+them when picking the slot to fill next, so a consumer that falls behind gets
+older frames, never torn ones. Several consumers (e.g. forked server workers)
+can share one capture, each with its own index.
+
+Uses the fork start method (Linux), so the unguarded top-level scripts are not
+re-executed in the child the way spawn would.
+"""
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+
+# Slots of the current and the previous read() stay checked out, per consumer
+HELD_SLOTS = 2
+
+
+def _next_slot(latest, held, slots):
+    """First slot after latest that is neither the newest frame nor checked out."""
+    n = (latest + 1) % slots
+    while n == latest or n in held:
+        n = (n + 1) % slots
+    return n
+
+
+def _capture_main(index, width, height, fps, fourcc, slots, info_q, latest, held, slot_lock,
+                  new_frames, stop):
+    cap = cv2.VideoCapture(index)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    if fourcc:
+        # Raw frames straight from the driver, no conversion in OpenCV
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        if int(cap.get(cv2.CAP_PROP_FOURCC)) != cv2.VideoWriter_fourcc(*fourcc):
+            # Format not supported by the camera, fall back to BGR
+            cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+
+    ret, frame = cap.read() if cap.isOpened() else (False, None)
+    if not ret:
+        info_q.put(None)
+        cap.release()
+        return
+
+    shm = shared_memory.SharedMemory(create=True, size=frame.nbytes * slots)
+    ring = np.ndarray((slots,) + frame.shape, dtype=frame.dtype, buffer=shm.buf)
+    ring[0] = frame
+    info_q.put((shm.name, slots, frame.shape, frame.dtype.str, int(cap.get(cv2.CAP_PROP_FOURCC))))
+    for new_frame in new_frames:
+        new_frame.set()
+
+    try:
+        while not stop.is_set():
+            # The lock orders the slot choice against the consumer's checkout,
+            # the frame itself is written without holding it
+            with slot_lock:
+                n = _next_slot(latest.value, held[:], slots)
+            slot = ring[n]
+            # Decode straight into the slot when OpenCV can reuse the buffer
+            ret, frame = cap.read(slot)
+            if not ret:
+                break
+            if frame.ctypes.data != slot.ctypes.data:
+                np.copyto(slot, frame)
+            with slot_lock:
+                latest.value = n
+            for new_frame in new_frames:
+                new_frame.set()
+    finally:
+        cap.release()
+        # Drop every view on the buffer, close() fails while any is alive
+        ring = slot = frame = None
+        shm.close()
+        shm.unlink()
+
+
+class SharedMemoryCapture:
+    """cv2.VideoCapture replacement that captures in a child process.
+
+    The frame returned by read() is a view into shared memory. Its slot stays
+    checked out, and so is never overwritten, until the second read() after it,
+    so a frame can still be in use (e.g. by an async sender) while the next one
+    is read. Needs ``HELD_SLOTS * consumers + 2`` slots: the checked-out ones,
+    the newest frame and one to capture into.
+
+    With ``consumers > 1``, open() it before forking the consumer processes and
+    pass each one its own index to read(); only the opening process may
+    release() it.
+    """
+
+    def __init__(self, index, width, height, fps, fourcc=None, slots=4, consumers=1):
+        min_slots = HELD_SLOTS * consumers + 2
+        if slots < min_slots:
+            raise ValueError(f"slots must be at least {min_slots}, got {slots}")
+        self._ctx = mp.get_context("fork")
+        self._info_q = self._ctx.Queue()
+        self._latest = self._ctx.Value("i", 0, lock=False)
+        self._held = self._ctx.Array("i", [-1] * (HELD_SLOTS * consumers), lock=False)
+        self._slot_lock = self._ctx.Lock()
+        # One wake-up per consumer, so consumers do not clear each other's
+        self._new_frames = [self._ctx.Event() for _ in range(consumers)]
+        self._stop = self._ctx.Event()
+        self._process = self._ctx.Process(
+            target=_capture_main,
+            args=(index, width, height, fps, fourcc, slots, self._info_q,
+                  self._latest, self._held, self._slot_lock, self._new_frames, self._stop),
+            daemon=True,
+        )
+        self._owner_pid = os.getpid()
+        self._shm = None
+        self._ring = None
+        self.fourcc = 0
+
+    def open(self, timeout=10.0):
+        """Start the capture process; returns False if the camera could not be opened"""
+        self._process.start()
+        try:
+            info = self._info_q.get(timeout=timeout)
+        except Exception:
+            info = None
+        if info is None:
+            self.release()
+            return False
+        name, slots, shape, dtype, self.fourcc = info
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._ring = np.ndarray((slots,) + tuple(shape), dtype=np.dtype(dtype), buffer=self._shm.buf)
+        return True
+
+    def read(self, timeout=1.0, consumer=0):
+        """Return (ok, frame) for the newest frame, waiting up to timeout for one"""
+        new_frame = self._new_frames[consumer]
+        if not new_frame.wait(timeout):
+            return False, None
+        # Only the opening process can poll its child, other consumers rely
+        # on the timeout once frames stop coming
+        if os.getpid() == self._owner_pid and not self._process.is_alive():
+            return False, None
+        new_frame.clear()
+        held = consumer * HELD_SLOTS
+        with self._slot_lock:
+            n = self._latest.value
+            # Check out the newest slot, release the one from two reads ago
+            self._held[held + 1] = self._held[held]
+            self._held[held] = n
+        return True, self._ring[n]
+
+    def release(self):
+        self._stop.set()
+        self._process.join(timeout=2.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        if self._shm is not None:
+            self._ring = None
+            try:
+                self._shm.close()
+            except BufferError:
+                # A frame returned by read() is still referenced, the mapping
+                # goes away with the process
+                pass
+            self._shm = None
@@ -4,18 +4,71 @@ Robust WebRTC receiver for Linux localhost testing.
 Receives video stream using aiortc with improved error handling.
 """
 import asyncio
+import concurrent.futures
+import time
 import cv2
 import numpy as np
 from aiortc import RTCPeerConnection, RTCSessionDescription, MediaStreamTrack
 from aiortc.contrib.signaling import TcpSocketSignaling
 from av import VideoFrame
-from datetime import datetime
 import logging
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Overlay text style
+OVERLAY_FONT = cv2.FONT_HERSHEY_SIMPLEX
+OVERLAY_SCALE = 0.7
+OVERLAY_COLOR = (0, 255, 0)
+OVERLAY_THICKNESS = 2
+_GLYPH_CHARS = "0123456789:.- "
+(_, GLYPH_ASCENT), GLYPH_BASELINE = cv2.getTextSize(_GLYPH_CHARS + "Frame", OVERLAY_FONT, OVERLAY_SCALE, OVERLAY_THICKNESS)
+
+
+def render_glyph(text):
+    """Rasterize text once into a (sprite, mask) pair with a shared baseline."""
+    (width, _), _ = cv2.getTextSize(text, OVERLAY_FONT, OVERLAY_SCALE, OVERLAY_THICKNESS)
+    sprite = np.zeros((GLYPH_ASCENT + GLYPH_BASELINE, width, 3), dtype=np.uint8)
+    # No LINE_AA, so the mask is exact and the blit needs no blending
+    cv2.putText(sprite, text, (0, GLYPH_ASCENT), OVERLAY_FONT, OVERLAY_SCALE, OVERLAY_COLOR, OVERLAY_THICKNESS, cv2.LINE_8)
+    return sprite, sprite.any(axis=2, keepdims=True)
+
+
+# Sprites for every character the overlays use, plus the static counter label
+GLYPHS = {ch: render_glyph(ch) for ch in _GLYPH_CHARS}
+FRAME_LABEL = render_glyph("Frame: ")
+
+
+def blit_glyphs(frame_array, sprites, x, y):
+    """Copy sprites side by side into frame_array, y is the text baseline."""
+    top = y - GLYPH_ASCENT
+    if top < 0:
+        return
+    for sprite, mask in sprites:
+        h, w = mask.shape[:2]
+        roi = frame_array[top:top + h, x:x + w]
+        if roi.shape[:2] != (h, w):
+            # Clipped at the frame edge
+            break
+        np.copyto(roi, sprite, where=mask)
+        x += w
+
+
+def plane_view(plane, rows, cols):
+    """View of the visible part of a PyAV plane, skipping the line padding."""
+    return np.frombuffer(plane, dtype=np.uint8).reshape(-1, plane.line_size)[:rows, :cols]
+
+
+def encode_and_write(path, frame_array):
+    """JPEG-encode a frame and write it to disk (runs on the write pool)."""
+    ok, buf = cv2.imencode('.jpg', frame_array)
+    if not ok:
+        logger.error(f"Failed to encode {path}")
+        return
+    with open(path, 'wb') as f:
+        f.write(buf)
+
 
 class RobustVideoReceiver:
     """Robust video receiver with error handling and recovery."""
@@ -29,74 +82,193 @@ class RobustVideoReceiver:
         self.error_count = 0
         self.max_consecutive_errors = 10
         self.running = True
+        # Set once the receiver has stopped, for whoever waits on it
+        self.stopped = asyncio.Event()
+        # Timestamp text up to the seconds, only rebuilt when the second changes
+        self._ts_second = 0
+        self._ts_prefix_glyphs = []
+        # Conversion buffers, allocated on the first frame and on size changes
+        self._bgr_buf = None
+        self._i420_buf = None
+        # Frame converter, picked from the type of the first frame
+        self._convert = None
+        # All HighGUI calls go to this one thread, off the event loop
+        self._display_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        # JPEG encoding and file writes, also off the event loop
+        self._write_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
         
         # Create output directory if saving frames
         if self.save_frames:
             import os
             os.makedirs(self.output_dir, exist_ok=True)
     
+    def _timestamp_glyphs(self):
+        """Glyphs for the current local time as YYYY-mm-dd HH:MM:SS.mmm"""
+        sec, rem = divmod(time.time_ns(), 1_000_000_000)
+        if sec != self._ts_second:
+            self._ts_second = sec
+            prefix = time.strftime("%Y-%m-%d %H:%M:%S.", time.localtime(sec))
+            self._ts_prefix_glyphs = [GLYPHS[ch] for ch in prefix]
+        return self._ts_prefix_glyphs + [GLYPHS[ch] for ch in f"{rem // 1_000_000:03d}"]
+    
+    def _to_bgr(self, frame):
+        """Convert a VideoFrame to BGR in the persistent buffer (overwritten per frame)."""
+        w, h = frame.width, frame.height
+        if self._bgr_buf is None or self._bgr_buf.shape[:2] != (h, w):
+            self._bgr_buf = np.empty((h, w, 3), dtype=np.uint8)
+            self._i420_buf = np.empty((h * 3 // 2, w), dtype=np.uint8)
+        
+        if frame.format.name == "yuv420p":
+            # Pack the planes into the I420 buffer and convert with OpenCV,
+            # no per-frame allocation at all
+            y_plane, u_plane, v_plane = frame.planes
+            np.copyto(self._i420_buf[:h], plane_view(y_plane, h, w))
+            chroma = self._i420_buf[h:].reshape(2, h // 2, w // 2)
+            np.copyto(chroma[0], plane_view(u_plane, h // 2, w // 2))
+            np.copyto(chroma[1], plane_view(v_plane, h // 2, w // 2))
+            cv2.cvtColor(self._i420_buf, cv2.COLOR_YUV2BGR_I420, dst=self._bgr_buf)
+        else:
+            plane = frame.reformat(format="bgr24").planes[0]
+            np.copyto(self._bgr_buf, plane_view(plane, h, w * 3).reshape(h, w, 3))
+        return self._bgr_buf
+    
     async def handle_track(self, track):
         """
         Handle incoming video track with robust error handling.
         
+        Receiving and rendering run as separate coroutines joined by a
+        one-slot queue, so a slow display drops stale frames instead of
+        letting them pile up in aiortc's buffers.
+        
         Args:
             track: MediaStreamTrack to receive frames from
         """
         logger.info(f"Starting to handle {track.kind} track")
         self.track = track
+        self._frames = asyncio.Queue(maxsize=1)
+        
+        pump = asyncio.create_task(self._pump(track))
+        try:
+            await self._render()
+        finally:
+            pump.cancel()
+            self.running = False
+            self.stopped.set()
+        
+        logger.info(f"Track handling stopped. Total frames: {self.frame_count}, Errors: {self.error_count}")
+        
+        # Cleanup (on the display thread, HighGUI windows belong to it)
+        loop = asyncio.get_running_loop()
+        if self.display:
+            await loop.run_in_executor(self._display_executor, cv2.destroyAllWindows)
+        self._display_executor.shutdown(wait=False)
+        # Let queued frame writes finish, waiting off the event loop
+        await loop.run_in_executor(None, self._write_pool.shutdown)
+    
+    def _save(self, loop, filename, frame_array):
+        """Queue a frame for writing; copied because the BGR buffer is reused."""
+        loop.run_in_executor(self._write_pool, encode_and_write, filename, frame_array.copy())
+    
+    @staticmethod
+    def _blit(frame_array):
+        """Show a frame and return the pressed key (runs on the display thread)."""
+        cv2.imshow("WebRTC Receiver", frame_array)
+        return cv2.waitKey(1) & 0xFF
+    
+    async def _pump(self, track):
+        """Receive frames and keep only the newest one in the queue."""
         consecutive_errors = 0
         
+        try:
+            while self.running:
+                try:
+                    # Receive frame with timeout
+                    frame = await asyncio.wait_for(track.recv(), timeout=5.0)
+                    
+                    # Reset error counter on successful frame receive
+                    consecutive_errors = 0
+                    self.frame_count += 1
+                    
+                    # Drop the frame the renderer has not picked up yet
+                    if self._frames.full():
+                        self._frames.get_nowait()
+                    self._frames.put_nowait(frame)
+                    
+                except asyncio.TimeoutError:
+                    consecutive_errors += 1
+                    logger.warning(f"Timeout waiting for frame (consecutive: {consecutive_errors}/{self.max_consecutive_errors})")
+                    
+                    if consecutive_errors >= self.max_consecutive_errors:
+                        logger.error("Too many consecutive timeouts, stopping")
+                        self.running = False
+                        break
+                    
+                    # Wait a bit before retrying
+                    await asyncio.sleep(0.5)
+                    
+                except asyncio.CancelledError:
+                    logger.info("Track handling cancelled")
+                    break
+                    
+                except Exception as e:
+                    consecutive_errors += 1
+                    self.error_count += 1
+                    logger.error(f"Error receiving frame: {type(e).__name__}: {str(e)}")
+                    
+                    if consecutive_errors >= self.max_consecutive_errors:
+                        logger.error("Too many consecutive errors, stopping")
+                        self.running = False
+                        break
+                    
+                    # Check if it's a connection error
+                    if "Connection" in str(e) or "closed" in str(e).lower():
+                        logger.error("Connection error detected, stopping")
+                        self.running = False
+                        break
+                    
+                    # Wait before retrying
+                    await asyncio.sleep(0.5)
+        finally:
+            # Wake the renderer so it can exit
+            if self._frames.full():
+                self._frames.get_nowait()
+            self._frames.put_nowait(None)
+    
+    async def _render(self):
+        """Convert, annotate, display and save the newest received frame."""
+        loop = asyncio.get_running_loop()
         while self.running:
+            frame = await self._frames.get()
+            if frame is None:
+                break
+            
             try:
-                # Receive frame with timeout
-                frame = await asyncio.wait_for(track.recv(), timeout=5.0)
-                
-                # Reset error counter on successful frame receive
-                consecutive_errors = 0
-                self.frame_count += 1
-                
-                # Convert frame to numpy array
-                if isinstance(frame, VideoFrame):
-                    frame_array = frame.to_ndarray(format="bgr24")
-                elif isinstance(frame, np.ndarray):
-                    frame_array = frame
-                else:
-                    logger.warning(f"Unexpected frame type: {type(frame)}")
-                    continue
+                # Convert frame to numpy array. The track always yields the
+                # same type, so the type checks only run until one matches
+                if self._convert is None:
+                    if isinstance(frame, VideoFrame):
+                        self._convert = self._to_bgr
+                    elif isinstance(frame, np.ndarray):
+                        self._convert = lambda f: f
+                    else:
+                        logger.warning(f"Unexpected frame type: {type(frame)}")
+                        continue
+                frame_array = self._convert(frame)
                 
                 # Log every 30th frame to avoid spam
                 if self.frame_count % 30 == 0:
                     logger.info(f"Received frame {self.frame_count} (shape: {frame_array.shape})")
                 
-                # Add timestamp overlay
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-                cv2.putText(
-                    frame_array, 
-                    timestamp, 
-                    (10, frame_array.shape[0] - 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 
-                    0.7, 
-                    (0, 255, 0), 
-                    2, 
-                    cv2.LINE_AA
-                )
+                # Add timestamp overlay (pre-rendered glyphs instead of putText)
+                blit_glyphs(frame_array, self._timestamp_glyphs(), 10, frame_array.shape[0] - 30)
                 
                 # Add frame counter
-                cv2.putText(
-                    frame_array,
-                    f"Frame: {self.frame_count}",
-                    (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.7,
-                    (0, 255, 0),
-                    2,
-                    cv2.LINE_AA
-                )
+                blit_glyphs(frame_array, [FRAME_LABEL] + [GLYPHS[ch] for ch in str(self.frame_count)], 10, 30)
                 
                 # Display frame
                 if self.display:
-                    cv2.imshow("WebRTC Receiver", frame_array)
-                    key = cv2.waitKey(1) & 0xFF
+                    # Awaited, so the buffer is not reused while it is shown
+                    key = await loop.run_in_executor(self._display_executor, self._blit, frame_array)
                     if key == ord('q'):
                         logger.info("User requested quit")
                         self.running = False
@@ -104,55 +276,18 @@ class RobustVideoReceiver:
                     elif key == ord('s'):
                         # Save frame on 's' key
                         filename = f"{self.output_dir}/manual_frame_{self.frame_count}.jpg"
-                        cv2.imwrite(filename, frame_array)
+                        self._save(loop, filename, frame_array)
                         logger.info(f"Manually saved frame to {filename}")
                 
                 # Save frame if enabled
                 if self.save_frames and self.frame_count % 30 == 0:  # Save every 30th frame
                     filename = f"{self.output_dir}/received_frame_{self.frame_count}.jpg"
-                    cv2.imwrite(filename, frame_array)
+                    self._save(loop, filename, frame_array)
                     logger.debug(f"Saved frame to {filename}")
                 
-            except asyncio.TimeoutError:
-                consecutive_errors += 1
-                logger.warning(f"Timeout waiting for frame (consecutive: {consecutive_errors}/{self.max_consecutive_errors})")
-                
-                if consecutive_errors >= self.max_consecutive_errors:
-                    logger.error("Too many consecutive timeouts, stopping")
-                    self.running = False
-                    break
-                
-                # Wait a bit before retrying
-                await asyncio.sleep(0.5)
-                
-            except asyncio.CancelledError:
-                logger.info("Track handling cancelled")
-                break
-                
             except Exception as e:
-                consecutive_errors += 1
                 self.error_count += 1
-                logger.error(f"Error receiving frame: {type(e).__name__}: {str(e)}")
-                
-                if consecutive_errors >= self.max_consecutive_errors:
-                    logger.error("Too many consecutive errors, stopping")
-                    self.running = False
-                    break
-                
-                # Check if it's a connection error
-                if "Connection" in str(e) or "closed" in str(e).lower():
-                    logger.error("Connection error detected, stopping")
-                    self.running = False
-                    break
-                
-                # Wait before retrying
-                await asyncio.sleep(0.5)
-        
-        logger.info(f"Track handling stopped. Total frames: {self.frame_count}, Errors: {self.error_count}")
-        
-        # Cleanup
-        if self.display:
-            cv2.destroyAllWindows()
+                logger.error(f"Error rendering frame: {type(e).__name__}: {str(e)}")
 
 
 async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=False):
@@ -169,6 +304,10 @@ async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=Fa
     
     # Create signaling and peer connection
     signaling = TcpSocketSignaling(host, port)
+    # aiortc has no playout-delay / jitter buffer target knob and does not
+    # negotiate the playout-delay header extension. Its video jitter buffer
+    # already hands a frame to the decoder as soon as it is complete, so the
+    # receive side adds at most the one-frame queue in handle_track.
     pc = RTCPeerConnection()
     
     # Create video receiver
@@ -184,16 +323,25 @@ async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=Fa
             else:
                 logger.warning(f"Ignoring non-video track: {track.kind}")
     
+    # Set on "connected", and also on "failed"/"closed" so the wait below wakes up
+    connection_settled = asyncio.Event()
+    
     # Connection state handler
     @pc.on("connectionstatechange")
     async def on_connectionstatechange():
         logger.info(f"Connection state: {pc.connectionState}")
-        if pc.connectionState == "failed":
+        if pc.connectionState == "connected":
+            connection_settled.set()
+        elif pc.connectionState == "failed":
             logger.error("Connection failed")
             video_receiver.running = False
+            video_receiver.stopped.set()
+            connection_settled.set()
         elif pc.connectionState == "closed":
             logger.info("Connection closed")
             video_receiver.running = False
+            video_receiver.stopped.set()
+            connection_settled.set()
     
     try:
         # Connect to signaling server
@@ -221,21 +369,17 @@ async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=Fa
         
         # Wait for connection
         logger.info("Waiting for connection...")
-        timeout = 30  # 30 seconds timeout
-        for i in range(timeout * 10):
-            if pc.connectionState == "connected":
-                break
-            if pc.connectionState in ["failed", "closed"]:
-                raise RuntimeError(f"Connection {pc.connectionState}")
-            await asyncio.sleep(0.1)
-        else:
+        try:
+            await asyncio.wait_for(connection_settled.wait(), timeout=30)
+        except asyncio.TimeoutError:
             raise RuntimeError("Connection timeout")
+        if pc.connectionState != "connected":
+            raise RuntimeError(f"Connection {pc.connectionState}")
         
         logger.info("Connection established successfully!")
         
         # Keep running while receiver is active
-        while video_receiver.running:
-            await asyncio.sleep(0.1)
+        await video_receiver.stopped.wait()
         
     except KeyboardInterrupt:
         logger.info("Interrupted by user")
@@ -257,7 +401,14 @@ async def run_receiver(host="127.0.0.1", port=9999, display=True, save_frames=Fa
             logger.debug(f"Error closing peer connection: {e}")
         
         if display:
-            cv2.destroyAllWindows()
+            # On the display thread too, HighGUI is only ever touched from there
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    video_receiver._display_executor, cv2.destroyAllWindows
+                )
+            except RuntimeError:
+                # handle_track already closed the windows and shut the thread down
+                pass
         
         logger.info("Receiver stopped")
 
@@ -274,6 +425,12 @@ async def main():
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
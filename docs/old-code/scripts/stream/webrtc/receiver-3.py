@@ -4,6 +4,7 @@ WebRTC receiver with person detection using YOLO.
 Detects and tracks people in real-time video stream.
 """
 import asyncio
+import concurrent.futures
 import cv2
 import numpy as np
 from aiortc import RTCPeerConnection, RTCSessionDescription, MediaStreamTrack
@@ -16,28 +17,59 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# int8-quantized SSD-MobileNet from the ONNX model zoo (ssd_mobilenet_v1_12-int8),
+# takes a uint8 RGB image in NHWC layout and does its own NMS
+ONNX_MODEL = "ssd_mobilenet_v1_12-int8.onnx"
+ONNX_OUTPUTS = ["detection_boxes:0", "detection_classes:0", "detection_scores:0", "num_detections:0"]
+COCO_PERSON = 1
+
+# HOG is skipped while the 64x48 grayscale thumbnail changes by less than this
+# mean absolute difference per pixel
+MOTION_THRESHOLD = 2.0
+
+# Label background sized once for the widest label ("Person 00.00"),
+# instead of measuring every label per detection
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+(LABEL_W, LABEL_H), _ = cv2.getTextSize("Person 00.00", LABEL_FONT, 0.5, 2)
+
 
 class PersonDetector:
-    """Person detection using HOG or Haar Cascade (OpenCV built-in only)."""
+    """Person detection using HOG, Haar Cascade or a quantized ONNX SSD model."""
     
-    def __init__(self, method="hog", confidence_threshold=0.5):
+    def __init__(self, method="hog", confidence_threshold=0.5, model_path=ONNX_MODEL):
         """
         Initialize person detector.
         
         Args:
-            method: Detection method - "hog" or "haar"
-            confidence_threshold: Minimum confidence for detections (used for HOG)
+            method: Detection method - "hog", "haar" or "onnx"
+            confidence_threshold: Minimum confidence for detections (used for HOG and ONNX)
+            model_path: ONNX model file (used for ONNX)
         """
         self.method = method
         self.confidence_threshold = confidence_threshold
         self.person_count = 0
         
-        logger.info(f"Initializing person detector with method: {method}")
+        # Single worker, detection runs off the event loop one frame at a time
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        
+        # Thumbnail and result of the last HOG run, for the motion gate
+        self._last_gray_small = None
+        self._last_detections = []
+        
+        # Run detection through OpenCV's transparent API (UMat) when an
+        # OpenCL device is available, on the CPU otherwise
+        self.use_opencl = cv2.ocl.haveOpenCL()
+        if self.use_opencl:
+            cv2.ocl.setUseOpenCL(True)
+        
+        logger.info(f"Initializing person detector with method: {method} (OpenCL: {self.use_opencl})")
         
         if method == "hog":
             self._init_hog()
         elif method == "haar":
             self._init_haar()
+        elif method == "onnx":
+            self._init_onnx(model_path)
         else:
             logger.warning(f"Unknown method {method}, defaulting to HOG")
             self.method = "hog"
@@ -69,13 +101,36 @@ class PersonDetector:
             logger.error(f"Failed to initialize Haar Cascade: {e}")
             raise
     
+    def _init_onnx(self, model_path):
+        """Initialize the ONNX Runtime session for the SSD detector."""
+        try:
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = ort.InferenceSession(
+                model_path, sess_options=options, providers=["CPUExecutionProvider"]
+            )
+            self.onnx_input = self.session.get_inputs()[0].name
+            logger.info(f"ONNX detector initialized from {model_path}")
+        except Exception as e:
+            logger.error(f"Failed to initialize ONNX detector: {e}")
+            raise
+    
     def detect_hog(self, frame):
         """Detect people using HOG."""
         detections = []
         try:
+            # Cheap motion gate: reuse the last result while the scene is static
+            gray_small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (64, 48), interpolation=cv2.INTER_AREA)
+            if (self._last_gray_small is not None and
+                    cv2.norm(gray_small, self._last_gray_small, cv2.NORM_L1) < MOTION_THRESHOLD * gray_small.size):
+                return self._last_detections
+            
             # Resize frame for faster processing
             scale = 0.5
             small_frame = cv2.resize(frame, None, fx=scale, fy=scale)
+            if self.use_opencl:
+                small_frame = cv2.UMat(small_frame)
             
             # Detect people with error handling
             boxes, weights = self.hog.detectMultiScale(
@@ -85,6 +140,11 @@ class PersonDetector:
                 scale=1.05
             )
             
+            # Gate against the frame HOG last ran on, so slow drift still triggers
+            # a new run. The list is filled in place below
+            self._last_gray_small = gray_small
+            self._last_detections = detections
+            
             # Handle case where no detections
             if len(boxes) == 0:
                 return detections
@@ -113,6 +173,8 @@ class PersonDetector:
         """Detect people using Haar Cascade."""
         detections = []
         try:
+            if self.use_opencl:
+                frame = cv2.UMat(frame)
             gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
             
             boxes = self.haar_cascade.detectMultiScale(
@@ -136,6 +198,33 @@ class PersonDetector:
         
         return detections
     
+    def detect_onnx(self, frame):
+        """Detect people using the ONNX SSD model."""
+        detections = []
+        try:
+            height, width = frame.shape[:2]
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            boxes, classes, scores, num = self.session.run(
+                ONNX_OUTPUTS, {self.onnx_input: rgb[np.newaxis]}
+            )
+            
+            n = int(num[0])
+            for box, cls, score in zip(boxes[0, :n], classes[0, :n], scores[0, :n]):
+                if int(cls) != COCO_PERSON or score < self.confidence_threshold:
+                    continue
+                
+                # Boxes are normalized (ymin, xmin, ymax, xmax)
+                ymin, xmin, ymax, xmax = box
+                x, y = int(xmin * width), int(ymin * height)
+                detections.append({
+                    'bbox': (x, y, int(xmax * width) - x, int(ymax * height) - y),
+                    'confidence': float(score)
+                })
+        except Exception as e:
+            logger.debug(f"Detection error (non-critical): {e}")
+        
+        return detections
+    
     def detect(self, frame):
         """
         Detect people in frame.
@@ -151,52 +240,63 @@ class PersonDetector:
                 return self.detect_hog(frame)
             elif self.method == "haar":
                 return self.detect_haar(frame)
+            elif self.method == "onnx":
+                return self.detect_onnx(frame)
             else:
                 return []
         except Exception as e:
             logger.error(f"Detection failed: {e}")
             return []
     
-    def draw_detections(self, frame, detections):
+    async def detect_async(self, frame):
+        """Run detect() on the worker thread, so the event loop keeps receiving frames."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self.detect, frame)
+    
+    def close(self):
+        """Stop the detection worker."""
+        self._pool.shutdown(wait=False)
+    
+    def draw_detections(self, frame, detections, in_place=True):
         """
         Draw bounding boxes on frame.
         
         Args:
             frame: BGR image
             detections: List of detections
+            in_place: Draw into frame itself instead of a copy
             
         Returns:
             Annotated frame
         """
-        annotated = frame.copy()
+        annotated = frame if in_place else frame.copy()
         
         try:
-            for det in detections:
-                x, y, w, h = det['bbox']
+            if not detections:
+                return annotated
+            
+            # Integer boxes, clamped to the frame bounds for all detections at once
+            height, width = frame.shape[:2]
+            boxes = np.array([det['bbox'] for det in detections], dtype=np.int32).reshape(-1, 4)
+            np.clip(boxes[:, 0], 0, width - 1, out=boxes[:, 0])
+            np.clip(boxes[:, 1], 0, height - 1, out=boxes[:, 1])
+            np.clip(boxes[:, 2], 1, width - boxes[:, 0], out=boxes[:, 2])
+            np.clip(boxes[:, 3], 1, height - boxes[:, 1], out=boxes[:, 3])
+            
+            for (x, y, w, h), det in zip(boxes.tolist(), detections):
                 confidence = det['confidence']
                 
-                # Ensure coordinates are valid integers
-                x, y, w, h = int(x), int(y), int(w), int(h)
-                
-                # Clamp coordinates to frame bounds
-                height, width = frame.shape[:2]
-                x = max(0, min(x, width - 1))
-                y = max(0, min(y, height - 1))
-                w = max(1, min(w, width - x))
-                h = max(1, min(h, height - y))
-                
                 # Draw rectangle
                 color = (0, 255, 0)  # Green
                 cv2.rectangle(annotated, (x, y), (x + w, y + h), color, 2)
                 
                 # Draw label
                 label = f"Person {confidence:.2f}"
-                label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
                 
                 # Make sure label doesn't go out of bounds
-                label_y = max(label_size[1] + 10, y)
-                cv2.rectangle(annotated, (x, label_y - label_size[1] - 10), (x + label_size[0], label_y), color, -1)
-                cv2.putText(annotated, label, (x, label_y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
+                label_y = max(LABEL_H + 10, y)
+                cv2.rectangle(annotated, (x, label_y - LABEL_H - 10), (x + LABEL_W, label_y), color, -1)
+                cv2.putText(annotated, label, (x, label_y - 5), LABEL_FONT, 0.5, (0, 0, 0), 2)
         except Exception as e:
             logger.debug(f"Error drawing detections: {e}")
         
@@ -230,6 +330,13 @@ class VideoReceiverWithDetection:
         consecutive_errors = 0
         max_consecutive_errors = 10
         
+        # At most one detection in flight, frames arriving meanwhile are shown
+        # with the newest finished result (latest frame wins)
+        detect_task = None
+        detect_frame = None
+        detect_frame_number = 0
+        detections = []
+        
         while self.running:
             try:
                 # Receive frame with timeout
@@ -247,15 +354,26 @@ class VideoReceiverWithDetection:
                     logger.warning(f"Unexpected frame type: {type(frame)}")
                     continue
                 
-                # Detect people (process every frame for smooth detection)
-                try:
-                    detections = self.detector.detect(frame_array)
-                except Exception as e:
-                    logger.error(f"Detection error: {e}")
-                    detections = []
+                # Collect the finished detection and start one on this frame
+                fresh = False
+                if detect_task is not None and detect_task.done():
+                    try:
+                        detections = detect_task.result()
+                        fresh = True
+                    except Exception as e:
+                        logger.error(f"Detection error: {e}")
+                        detections = []
+                    detect_task = None
+                    # The frame the result belongs to, kept for saving it
+                    fresh_frame, fresh_frame_number = detect_frame, detect_frame_number
+                shared = detect_task is None
+                if shared:
+                    detect_task = asyncio.ensure_future(self.detector.detect_async(frame_array))
+                    detect_frame, detect_frame_number = frame_array, self.frame_count
                 
                 # Draw detections
-                annotated_frame = self.detector.draw_detections(frame_array, detections)
+                # Draw in place, unless the detector is still reading this frame
+                annotated_frame = self.detector.draw_detections(frame_array, detections, in_place=not shared)
                 
                 # Add info overlay
                 info_text = [
@@ -278,16 +396,19 @@ class VideoReceiverWithDetection:
                         cv2.LINE_AA
                     )
                 
-                # Log detections
-                if len(detections) > 0:
+                # Log detections, once per finished detection rather than for
+                # every frame its boxes are reused on
+                if fresh and len(detections) > 0:
                     if self.detection_count % 30 == 0:  # Log every 30 detections
-                        logger.info(f"Frame {self.frame_count}: Detected {len(detections)} person(s)")
+                        logger.info(f"Frame {fresh_frame_number}: Detected {len(detections)} person(s)")
                     self.detection_count += 1
                     
-                    # Save frame with detections
+                    # Save the frame the detection ran on, with its own boxes.
+                    # It was never drawn into, annotated frames are copies
+                    # while a detection reads them
                     if self.save_detections:
-                        filename = f"{self.output_dir}/detection_{self.frame_count}_{len(detections)}p.jpg"
-                        cv2.imwrite(filename, annotated_frame)
+                        filename = f"{self.output_dir}/detection_{fresh_frame_number}_{len(detections)}p.jpg"
+                        cv2.imwrite(filename, self.detector.draw_detections(fresh_frame, detections))
                 
                 # Display frame
                 if self.display:
@@ -327,6 +448,10 @@ class VideoReceiverWithDetection:
         
         logger.info(f"Stopped. Frames: {self.frame_count}, Detections: {self.detection_count}")
         
+        if detect_task is not None:
+            detect_task.cancel()
+        self.detector.close()
+        
         if self.display:
             cv2.destroyAllWindows()
 
@@ -413,6 +538,12 @@ async def main():
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
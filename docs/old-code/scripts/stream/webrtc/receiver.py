@@ -1,20 +1,56 @@
 import asyncio
+import os
+import sys
+import threading
+from queue import Queue, Empty, Full
 import cv2
 import numpy as np
-from aiortc import RTCPeerConnection, RTCSessionDescription, MediaStreamTrack
+from aiortc import RTCPeerConnection, MediaStreamTrack
 from aiortc.contrib.signaling import TcpSocketSignaling
 from av import VideoFrame
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from display import open_video_window
+
 class VideoReceiver:
     def __init__(self):
         self.track = None
+        self.frame_queue = Queue(maxsize=2)  # Small queue for low latency
+        self.running = True
+
+    def display_loop(self):
+        """Display frames in OpenCV window, so imshow never blocks the event loop"""
+        window_name = "Frame"
+        open_video_window(window_name)
+        
+        # Bound locally, the loop runs once per frame
+        imshow = cv2.imshow
+        poll_key = cv2.pollKey
+        
+        while self.running:
+            try:
+                frame = self.frame_queue.get(timeout=0.1)
+            except Empty:
+                # No frame available, just check keys
+                if cv2.waitKey(10) & 0xFF == ord('q'):
+                    self.running = False
+                continue
+            
+            imshow(window_name, frame)
+            
+            # Exit on 'q' key press (pollKey does not sleep like waitKey)
+            if poll_key() & 0xFF == ord('q'):
+                self.running = False
+        
+        cv2.destroyAllWindows()
 
     async def handle_track(self, track):
         print("Inside handle track")
         self.track = track
         frame_count = 0
-        while True:
+        
+        while self.running:
             try:
                 print("Waiting for frame...")
                 frame = await asyncio.wait_for(track.recv(), timeout=5.0)
@@ -42,11 +78,16 @@ class VideoReceiver:
 
                 cv2.imwrite(f"imgs/received_frame_{frame_count}.jpg", frame)
                 print(f"Saved frame {frame_count} to file")
-                cv2.imshow("Frame", frame)
-    
-                # Exit on 'q' key press
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+                
+                # Hand the frame to the display thread, dropping the oldest
+                try:
+                    self.frame_queue.put_nowait(frame)
+                except Full:
+                    try:
+                        self.frame_queue.get_nowait()
+                    except Empty:
+                        pass
+                    self.frame_queue.put_nowait(frame)
                 # if frame_count >= 300:
                 #     break
             except asyncio.TimeoutError:
@@ -102,9 +143,6 @@ async def main():
     signaling = TcpSocketSignaling("127.0.0.1", 9999)
     pc = RTCPeerConnection()
     
-    global video_receiver
-    video_receiver = VideoReceiver()
-
     try:
         await run(pc, signaling)
     except Exception as e:
@@ -114,6 +152,19 @@ async def main():
         await pc.close()
 
 if __name__ == "__main__":
+    video_receiver = VideoReceiver()
+    
+    # highgui wants to be driven from a thread started by the main thread,
+    # the event loop only handles track.recv()
+    display_thread = threading.Thread(target=video_receiver.display_loop, daemon=True)
+    display_thread.start()
+    
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     asyncio.run(main())
     
 
@@ -4,13 +4,79 @@ Minimal WebRTC sender for Linux localhost testing.
 Streams video from a camera using aiortc.
 """
 import asyncio
+import threading
 import cv2
+import numpy as np
 from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
+from aiortc.codecs import h264, vpx
 from aiortc.contrib.signaling import TcpSocketSignaling
 from av import VideoFrame
 import fractions
 
 
+def configure_bitrate(min_bitrate, start_bitrate, max_bitrate):
+    """
+    Set the bitrate range of aiortc's VP8 and H.264 encoders.
+    
+    aiortc has no RTCRtpSender.setParameters; its encoders clamp every
+    bandwidth estimate (REMB) to these module-level limits, looked up at call
+    time. Raising the floor keeps a briefly stalled receiver from driving the
+    bitrate down to the point where the picture falls apart.
+    """
+    for codec in (vpx, h264):
+        codec.MIN_BITRATE = min_bitrate
+        codec.DEFAULT_BITRATE = start_bitrate
+        codec.MAX_BITRATE = max_bitrate
+
+
+class CaptureThread(threading.Thread):
+    """Grabs camera frames off the event loop into two alternating buffers."""
+    
+    def __init__(self, cap, loop):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.loop = loop
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.buf = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(2)]
+        self.latest_idx = 0
+        self.failed = False
+        self.running = True
+        # Set by the consumer when it wants a frame, from the thread when one is ready
+        self.wanted = threading.Event()
+        self.new_frame = asyncio.Event()
+    
+    def run(self):
+        write_idx = 0
+        while self.running:
+            # grab() only dequeues the buffer, so frames nobody asked for
+            # are never decoded
+            if not self.cap.grab():
+                self.failed = True
+                break
+            if not self.wanted.is_set():
+                continue
+            
+            ret, frame = self.cap.retrieve(self.buf[write_idx])
+            if not ret:
+                continue
+            if frame.ctypes.data != self.buf[write_idx].ctypes.data:
+                # Camera size differs from the preallocated buffer
+                self.buf[write_idx] = frame
+            
+            self.latest_idx = write_idx
+            write_idx ^= 1
+            self.wanted.clear()
+            self.loop.call_soon_threadsafe(self.new_frame.set)
+        
+        # Wake a waiting recv so it can see the failure
+        self.loop.call_soon_threadsafe(self.new_frame.set)
+    
+    def stop(self):
+        self.running = False
+        self.join(timeout=1.0)
+
+
 class VideoTrack(VideoStreamTrack):
     """Simple video track that captures from camera."""
     
@@ -20,38 +86,55 @@ class VideoTrack(VideoStreamTrack):
         if not self.cap.isOpened():
             raise RuntimeError(f"Cannot open camera {camera_id}")
         
-        # Set camera properties for better performance
+        # Set camera properties for better performance.
+        # MJPG cuts USB bandwidth and the JPEG is only decoded in retrieve(),
+        # i.e. for frames recv actually asks for
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         self.cap.set(cv2.CAP_PROP_FPS, 30)
         
         self.frame_count = 0
+        
+        # Track is created inside the running loop, so the thread can signal it
+        self.capture = CaptureThread(self.cap, asyncio.get_running_loop())
+        self.capture.start()
     
     async def recv(self):
         """Capture and return a video frame."""
         self.frame_count += 1
         
-        ret, frame = self.cap.read()
-        if not ret:
+        # Ask the capture thread for the next frame and wait for it
+        self.capture.wanted.set()
+        await self.capture.new_frame.wait()
+        self.capture.new_frame.clear()
+        if self.capture.failed:
             raise RuntimeError("Failed to read frame from camera")
+        frame = self.capture.buf[self.capture.latest_idx]
         
-        # Convert BGR to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Create video frame
-        video_frame = VideoFrame.from_ndarray(frame_rgb, format="rgb24")
+        # Create video frame straight from BGR, the encoder converts to YUV anyway
+        video_frame = VideoFrame.from_ndarray(frame, format="bgr24")
         video_frame.pts = self.frame_count
         video_frame.time_base = fractions.Fraction(1, 30)
         
         return video_frame
     
+    def stop(self):
+        """Stop the capture thread together with the track."""
+        super().stop()
+        if hasattr(self, 'capture'):
+            self.capture.stop()
+    
     def __del__(self):
         """Release camera on cleanup."""
+        if hasattr(self, 'capture'):
+            self.capture.stop()
         if hasattr(self, 'cap'):
             self.cap.release()
 
 
-async def run_sender(host="127.0.0.1", port=9999, camera_id=0):
+async def run_sender(host="127.0.0.1", port=9999, camera_id=0,
+                     min_bitrate=1_000_000, start_bitrate=2_000_000, max_bitrate=3_000_000):
     """
     Run the WebRTC sender.
     
@@ -59,10 +142,16 @@ async def run_sender(host="127.0.0.1", port=9999, camera_id=0):
         host: Signaling server host (default: localhost)
         port: Signaling server port
         camera_id: Camera device ID (0 for default camera)
+        min_bitrate: Lowest encoder bitrate congestion control may pick (bps)
+        start_bitrate: Encoder bitrate before the first estimate (bps)
+        max_bitrate: Highest encoder bitrate (bps)
     """
     print(f"Starting WebRTC sender on {host}:{port}")
     print(f"Using camera ID: {camera_id}")
     
+    # Must happen before the encoder is created on the first frame
+    configure_bitrate(min_bitrate, start_bitrate, max_bitrate)
+    
     # Create signaling connection
     signaling = TcpSocketSignaling(host, port)
     
@@ -126,8 +215,11 @@ async def main():
     HOST = "127.0.0.1"  # localhost
     PORT = 9999
     CAMERA_ID = 0  # Default camera
+    MIN_BITRATE = 1_000_000    # Floor for congestion control, fine on localhost/LAN
+    START_BITRATE = 2_000_000
+    MAX_BITRATE = 3_000_000
     
-    await run_sender(HOST, PORT, CAMERA_ID)
+    await run_sender(HOST, PORT, CAMERA_ID, MIN_BITRATE, START_BITRATE, MAX_BITRATE)
 
 
 if __name__ == "__main__":
@@ -1,36 +1,84 @@
 import asyncio
 import cv2
-from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
+from collections import deque
+import av
+from aiortc import RTCPeerConnection, RTCRtpSender, RTCSessionDescription, VideoStreamTrack
 from aiortc.contrib.signaling import TcpSocketSignaling
 from av import VideoFrame
 import fractions
 from datetime import datetime
 
+FPS = 30
+BIT_RATE = 1_500_000
+# Hardware H.264 encoders tried in order. They all take software frames;
+# h264_vaapi is left out because it needs a hw frames context PyAV cannot set up
+HW_ENCODERS = ("h264_nvenc", "h264_qsv", "h264_videotoolbox", "h264_v4l2m2m")
+
+
+def open_hw_encoder(width, height):
+    """Return an opened hardware H.264 encoder context, or None if none is available"""
+    for name in HW_ENCODERS:
+        try:
+            ctx = av.CodecContext.create(name, "w")
+            ctx.width = width
+            ctx.height = height
+            ctx.pix_fmt = "yuv420p" if name == "h264_v4l2m2m" else "nv12"
+            ctx.bit_rate = BIT_RATE
+            ctx.time_base = fractions.Fraction(1, FPS)
+            ctx.framerate = fractions.Fraction(FPS, 1)
+            # No B-frames and a keyframe every second, the receiver cannot
+            # request keyframes from an encoder aiortc does not own
+            ctx.max_b_frames = 0
+            ctx.gop_size = FPS
+            ctx.open()
+        except Exception:
+            continue
+        print(f"Using hardware encoder {name}")
+        return ctx
+    return None
+
+
 class CustomVideoStreamTrack(VideoStreamTrack):
     def __init__(self, camera_id):
         super().__init__()
         self.cap = cv2.VideoCapture(camera_id)
         self.frame_count = 0
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # With a hardware encoder recv() returns encoded packets and aiortc
+        # only packetizes them; otherwise aiortc encodes in software
+        self.encoder = open_hw_encoder(width, height)
+        self.pending_packets = deque()
 
     async def recv(self):
+        if self.encoder is None:
+            return await self.recv_frame()
+        # Encoders may buffer a frame before emitting a packet, so keep
+        # feeding frames until one comes out
+        while not self.pending_packets:
+            video_frame = await self.recv_frame()
+            if video_frame is None:
+                return None
+            for packet in self.encoder.encode(video_frame):
+                packet.time_base = self.encoder.time_base
+                self.pending_packets.append(packet)
+        return self.pending_packets.popleft()
+
+    async def recv_frame(self):
         self.frame_count += 1
         print(f"Sending frame {self.frame_count}")
         ret, frame = self.cap.read()
         if not ret:
             print("Failed to read frame from camera")
             return None
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        video_frame = VideoFrame.from_ndarray(frame, format="rgb24")
-        video_frame.pts = self.frame_count
-        video_frame.time_base = fractions.Fraction(1, 30)  # Use fractions for time_base
         # Add timestamp to the frame
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]  # Current time with milliseconds
         cv2.putText(frame, timestamp, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
 
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        video_frame = VideoFrame.from_ndarray(frame, format="rgb24")
+        # PyAV takes BGR directly, the conversion to YUV happens once in the encoder path
+        video_frame = VideoFrame.from_ndarray(frame, format="bgr24")
         video_frame.pts = self.frame_count
-        video_frame.time_base = fractions.Fraction(1, 30)  # Use fractions for time_base
+        video_frame.time_base = fractions.Fraction(1, FPS)  # Use fractions for time_base
         return video_frame
 
 async def setup_webrtc_and_run(ip_address, port, camera_id):
@@ -38,6 +86,13 @@ async def setup_webrtc_and_run(ip_address, port, camera_id):
     pc = RTCPeerConnection()
     video_sender = CustomVideoStreamTrack(camera_id)
     pc.addTrack(video_sender)
+    if video_sender.encoder is not None:
+        # Pre-encoded packets are H.264, so only offer H.264
+        capabilities = RTCRtpSender.getCapabilities("video")
+        h264 = [codec for codec in capabilities.codecs if codec.mimeType == "video/H264"]
+        for transceiver in pc.getTransceivers():
+            if transceiver.sender.track is video_sender:
+                transceiver.setCodecPreferences(h264)
 
     try:
         await signaling.connect()
@@ -1,3 +1,41 @@
-from .broker import *
+"""Apelios package.
 
-__all__ = ["NatsRuntimeManager"]
\ No newline at end of file
+Subpackages are imported on first attribute access (PEP 562), so importing
+apelios itself does not pull in nats, aioartnet or evdev.
+"""
+
+import importlib
+
+_SUBPACKAGES = ("artnet", "broker", "input", "middleware", "steamdeck")
+
+# Re-exported classes and the module that defines them
+_EXPORTS = {
+    "BrokerRuntimeManager": ".broker",
+    "BrokerClient": ".broker",
+    "NatsRuntimeManager": ".broker.nats_runtime_manager",
+}
+
+__all__ = [*_SUBPACKAGES, *_EXPORTS]
+
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        module_name, attr = f".{name}", None
+    elif name in _EXPORTS:
+        module_name, attr = _EXPORTS[name], name
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    try:
+        module = importlib.import_module(module_name, __name__)
+    except ImportError as e:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r} ({e})") from e
+
+    value = module if attr is None else getattr(module, attr)
+    # Cache it, later lookups no longer go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
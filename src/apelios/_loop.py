@@ -0,0 +1,21 @@
+"""Event loop setup shared by the apelios entry points."""
+
+import asyncio
+
+
+def install_uvloop() -> bool:
+    """
+    Use uvloop for asyncio.run() when it is installed.
+
+    uvloop is optional (not available on Windows), without it the default
+    loop is kept.
+
+    Returns:
+        bool: True if uvloop was installed
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
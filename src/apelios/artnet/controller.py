@@ -3,11 +3,25 @@
 
 import asyncio
 import logging
+import socket
+import struct
 from typing import Optional
+import numpy as np
 from aioartnet import ArtNetClient, ArtNetUniverse
 
 log = logging.getLogger(__name__)
 
+# Socket options for the Art-Net UDP socket: a larger send buffer, DSCP EF
+# (expedited forwarding) so switches queue DMX ahead of bulk traffic, and the
+# matching Linux queueing priority
+_SOCKET_OPTIONS = [
+    (socket.SOL_SOCKET, socket.SO_SNDBUF, 262144),
+    (socket.SOL_SOCKET, socket.SO_BROADCAST, 1),
+    (socket.IPPROTO_IP, socket.IP_TOS, 0xB8),
+]
+if hasattr(socket, "SO_PRIORITY"):
+    _SOCKET_OPTIONS.append((socket.SOL_SOCKET, socket.SO_PRIORITY, 6))
+
 
 class ArtNetController:
     """
@@ -37,12 +51,19 @@ class ArtNetController:
         self.universe_obj: Optional[ArtNetUniverse] = None
         
         # Initialize all 512 DMX channels to 0
-        self.dmx_data = bytearray(512)
+        self.dmx_data = np.zeros(512, dtype=np.uint8)
+        
+        # Handed to aioartnet on every send; set_dmx copies it into the
+        # universe's last_data right away, so no per-send snapshot is needed
+        self._dmx_view = memoryview(self.dmx_data)
         
         self._running = False
         self._connected = False
+        
+        # Output ticks skipped because the loop fell behind
+        self.dropped_frames = 0
     
-    async def connect(self):
+    async def connect(self) -> None:
         """
         Connect to Art-Net network.
         Must be called before sending data.
@@ -55,6 +76,7 @@ class ArtNetController:
         self.client.broadcast_ip = self.target_ip
         
         await self.client.connect()
+        self._tune_socket()
         
         # Configure universe for output
         self.universe_obj = self.client.set_port_config(
@@ -68,7 +90,21 @@ class ArtNetController:
         log.info(f"Sending Remote Input on Universe {self.universe}")
         log.info(f"Configure GrandMA to receive Universe {self.universe} as Remote Input")
     
-    def set_channel(self, channel: int, value: int):
+    def _tune_socket(self) -> None:
+        """Apply _SOCKET_OPTIONS to the client's UDP socket, where the OS allows it."""
+        transport = self.client.protocol.transport if self.client.protocol else None
+        sock = transport.get_extra_info("socket") if transport else None
+        if sock is None:
+            log.debug("No Art-Net socket to tune")
+            return
+        
+        for level, option, value in _SOCKET_OPTIONS:
+            try:
+                sock.setsockopt(level, option, value)
+            except OSError as e:
+                log.debug(f"Could not set socket option {option}: {e}")
+    
+    def set_channel(self, channel: int, value: int) -> bool:
         """
         Set a 16 bit DMX channel value.
         
@@ -93,7 +129,7 @@ class ArtNetController:
         self.dmx_data[channel - 1] = value
         return True
     
-    def set_channel_16bit(self, channel: int, value: int):
+    def set_channel_16bit(self, channel: int, value: int) -> bool:
         """
         Set a 16-bit DMX value (for pan/tilt).
         
@@ -112,13 +148,53 @@ class ArtNetController:
             log.warning(f"16-bit value {value} out of range (0-65535)")
             return False
         
-        # Split into MSB and LSB
-        msb = (value >> 8) & 0xFF
-        lsb = value & 0xFF
+        # MSB and LSB in one big-endian store, both channels are already in range
+        struct.pack_into(">H", self.dmx_data, channel - 1, value)
+        
+        return True
+    
+    def set_channels(self, channels: np.ndarray, values: np.ndarray) -> bool:
+        """
+        Set many DMX channels in one vectorized store.
         
-        self.set_channel(channel, msb)      # MSB
-        self.set_channel(channel + 1, lsb)  # LSB
+        Args:
+            channels: DMX channels (1-512)
+            values: DMX values, clipped to 0-255
+        
+        Returns:
+            bool: True if successful, False if a channel is out of range
+        """
+        channels = np.asarray(channels)
+        if channels.size == 0:
+            return True
         
+        if channels.min() < 1 or channels.max() > 512:
+            log.warning("Channels out of range (1-512)")
+            return False
+        
+        self.dmx_data[channels - 1] = np.clip(values, 0, 255)
+        return True
+    
+    def set_channels_16bit(self, channel: int, values: np.ndarray) -> bool:
+        """
+        Set consecutive 16-bit DMX values (MSB, LSB pairs) in one store.
+        
+        Args:
+            channel: Start channel for the first MSB
+            values: 16-bit values, clipped to 0-65535
+        
+        Returns:
+            bool: True if successful, False if the block does not fit
+        """
+        values = np.clip(values, 0, 65535).astype(np.uint16)
+        end = channel + 2 * values.size - 1
+        if channel < 1 or end > 512:
+            log.warning(f"16-bit block {channel}-{end} out of range (1-512)")
+            return False
+        
+        block = self.dmx_data[channel - 1:end]
+        block[0::2] = values >> 8    # MSB
+        block[1::2] = values & 0xFF  # LSB
         return True
     
     def get_channel(self, channel: int) -> Optional[int]:
@@ -132,7 +208,7 @@ class ArtNetController:
             Current value (0-255) or None if invalid channel
         """
         if 1 <= channel <= 512:
-            return self.dmx_data[channel - 1]
+            return int(self.dmx_data[channel - 1])
         return None
     
     def get_channel_16bit(self, channel: int) -> Optional[int]:
@@ -150,17 +226,18 @@ class ArtNetController:
         if not (1<= channel <= 511):
             return None
         
-        msb = self.dmx_data[channel - 1]
-        lsb = self.dmx_data[channel]
+        msb = int(self.dmx_data[channel - 1])
+        lsb = int(self.dmx_data[channel])
         
         return (msb << 8) | lsb    
     
-    def clear_all(self):
+    def clear_all(self) -> None:
         """Set all channels to 0."""
-        self.dmx_data = bytearray(512)
+        # Zero in place, the buffer itself is kept for the lifetime of the controller
+        self.dmx_data.fill(0)
         log.debug("Cleared all DMX channels to 0")
     
-    def send_now(self):
+    def send_now(self) -> None:
         """
         Immediately send current DMX state (all 512 channels).
         Normally not needed, as start() sends continuously.
@@ -169,10 +246,13 @@ class ArtNetController:
             log.error("Not connected! Call connect() first")
             return
         
+        # aioartnet unicasts ArtDmx to every subscriber it discovered, and its
+        # 1 s keep-alive re-sends the universe's last_data, so all output has
+        # to go through set_dmx to keep that copy current
         if self.universe_obj:
-            self.universe_obj.set_dmx(bytes(self.dmx_data))
+            self.universe_obj.set_dmx(self._dmx_view)
     
-    async def start(self):
+    async def start(self) -> None:
         """
         Start continuous Art-Net output.
         Sends all 512 channels repeatedly at configured rate.
@@ -190,23 +270,36 @@ class ArtNetController:
         
         log.info(f"Starting Art-Net output at {self.output_rate_hz}Hz")
         
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        
         try:
             while self._running:
                 # Send all 512 channels
                 self.send_now()
-                await asyncio.sleep(interval)
+                
+                # Sleep until an absolute deadline, so the time spent sending
+                # and the scheduler's wakeup slop do not add up over frames
+                next_tick += interval
+                delay = next_tick - loop.time()
+                if delay < 0:
+                    # Behind schedule, resync instead of bursting to catch up
+                    self.dropped_frames += int(-delay // interval)
+                    next_tick = loop.time()
+                    delay = 0
+                await asyncio.sleep(delay)
         except asyncio.CancelledError:
             log.info("Art-Net output loop cancelled")
         finally:
             self._running = False
     
-    def stop(self):
+    def stop(self) -> None:
         """Stop continuous Art-Net output."""
         if self._running:
             self._running = False
             log.info("Stopping Art-Net output")
     
-    async def close(self):
+    async def close(self) -> None:
         """
         Close Art-Net connection.
         Clears all channels and stops output.
@@ -224,5 +317,5 @@ class ArtNetController:
         
         self._connected = False
     
-    def __repr__(self):
+    def __repr__(self) -> str:
         return f"ArtNetController(universe={self.universe}, connected={self._connected}, running={self._running})"
\ No newline at end of file
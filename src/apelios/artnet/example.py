@@ -1,6 +1,8 @@
 import logging
 import asyncio
+import sys
 from apelios.artnet import ArtNetController
+from apelios._loop import install_uvloop
 
 # Logging EINMAL hier konfigurieren
 logging.basicConfig(
@@ -28,14 +30,37 @@ async def main():
     # Verbinden
     await artnet.connect()
     
-    # Output starten (als Task - läuft parallel)
-    output_task = asyncio.create_task(artnet.start())
+    # Hauptloop. Input und Art-Net-Output laufen im selben Loop, statt
+    # artnet.start() als zweiten Timer-Task daneben zu starten
+    loop = asyncio.get_running_loop()
+    next_step = loop.time()
+    send_interval = 1.0 / artnet.output_rate_hz
+    next_send = next_step
+    
+    # Beenden mit einer beliebigen Taste: stdin im cbreak-Modus, der Event-Loop
+    # meldet, wenn ein Zeichen anliegt (kein blockierender read() in einem Thread).
+    # Auf Windows (kein termios, kein add_reader für stdin) bleibt Ctrl+C
+    stop = asyncio.Event()
+    old_term = None
+    if sys.platform != "win32" and sys.stdin.isatty():
+        import termios
+        import tty
+        
+        stdin_fd = sys.stdin.fileno()
+        old_term = termios.tcgetattr(stdin_fd)
+        tty.setcbreak(stdin_fd)
+        
+        def on_key():
+            sys.stdin.read(1)
+            stop.set()
+        
+        loop.add_reader(stdin_fd, on_key)
+        log.info("Press any key to stop")
     
-    # Hauptloop
     try:
         direction = 1
         value = 0
-        while True:
+        while not stop.is_set():
             # Hier später: Steam Deck Input lesen
             value += direction
             if value >= 255:
@@ -46,14 +71,28 @@ async def main():
                 direction = 1
                 
             artnet.set_channel(1, value)
-            await asyncio.sleep(0.01)
+            
+            # Send on the Art-Net cadence. Every tick sends, the stream is
+            # also the receiver's keep-alive
+            now = loop.time()
+            if now >= next_send:
+                artnet.send_now()
+                next_send = max(next_send + send_interval, now)
+            
+            # 100 Hz ramp on absolute deadlines; when behind this is sleep(0)
+            next_step += 0.01
+            await asyncio.sleep(max(0, next_step - loop.time()))
     
     except KeyboardInterrupt:
         log.info("Stopping...")
     
     finally:
+        if old_term is not None:
+            loop.remove_reader(stdin_fd)
+            termios.tcsetattr(stdin_fd, termios.TCSADRAIN, old_term)
         await artnet.close()
 
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(main())
\ No newline at end of file
@@ -4,6 +4,7 @@ import logging
 import time
 from typing import Optional
 
+from apelios._loop import install_uvloop
 from apelios.broker.broker_runtime_manager import BrokerRuntimeManager
 from apelios.middleware.middleware_runtime_manager import MiddlewareRuntimeManager
 
@@ -111,4 +112,5 @@ async def main() -> None:
     await orchestrator.run_forever()
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(main())
\ No newline at end of file
@@ -5,6 +5,7 @@ This module publishes processed middleware state to the broker.
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from typing import TYPE_CHECKING
@@ -20,6 +21,8 @@ class MiddlewareOutputPublisher:
 
     def __init__(self, broker: BrokerClient) -> None:
         self.broker = broker
+        # Subject per target, built once instead of on every frame
+        self._subjects: dict[str, str] = {}
 
     async def publish(self, output_state: dict[str, float]) -> None:
         """Publish output state snapshot to broker.
@@ -27,6 +30,7 @@ class MiddlewareOutputPublisher:
         Args:
             output_state: dict mapping target name to value (e.g., {"group1.pan": 0.6})
         """
+        messages: list[tuple[str, bytes]] = []
         for target, value in output_state.items():
             try:
                 numeric_value = float(value)
@@ -34,10 +38,18 @@ class MiddlewareOutputPublisher:
                 logger.warning("Skipping output publish for non-numeric value", extra={"target": target})
                 continue
 
-            subject = f"outputs.{target}"
+            subject = self._subjects.get(target)
+            if subject is None:
+                subject = self._subjects[target] = f"outputs.{target}"
             payload = json.dumps({"value": numeric_value}).encode("utf-8")
-
-            try:
-                await self.broker.publish(subject, payload)
-            except Exception as e:
-                logger.error(f"Failed to publish {subject} to broker: {e}")
\ No newline at end of file
+            messages.append((subject, payload))
+
+        # Publish all targets concurrently, so one slow publish does not hold
+        # up the others; failures are reported per subject
+        results = await asyncio.gather(
+            *(self.broker.publish(subject, payload) for subject, payload in messages),
+            return_exceptions=True,
+        )
+        for (subject, _), result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to publish {subject} to broker: {result}")
\ No newline at end of file
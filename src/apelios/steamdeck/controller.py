@@ -1,7 +1,12 @@
 # /src/apelios/steamdeck/controller.py
 
+import time
+
 from bitsteam.deck import SteamDeck
 
+# printImu() writes at most this often, terminal output is slow
+PRINT_INTERVAL = 0.1
+
 class SteamdeckInputs:
     
     def __init__(self, sensitivity: float) -> None:
@@ -19,6 +24,7 @@ class SteamdeckInputs:
         
         self.deck = SteamDeck()
         self.angle = [0.0, 0.0]
+        self._last_print = 0.0
         
     
     def getAngle(self):
@@ -44,7 +50,12 @@ class SteamdeckInputs:
         return (gyro_pitch, gyro_yaw)
     
     def printImu(self):
-        """Print raw IMU rates"""
+        """Print raw IMU rates, at most every PRINT_INTERVAL seconds"""
+        now = time.monotonic()
+        if now - self._last_print < PRINT_INTERVAL:
+            return
+        self._last_print = now
+        
         imu = self.deck.get_imu_rates()
         
         # DEBUG: See what get_imu_rates() actually returns
@@ -0,0 +1,138 @@
+import asyncio
+import socket
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+from aioartnet.client import ArtNetClientProtocol
+from aioartnet.models import ArtNetNode
+
+from apelios.artnet.controller import ArtNetController
+
+
+def _controller() -> ArtNetController:
+    controller = ArtNetController(source_ip="127.0.0.1", target_ip="127.0.0.255")
+    controller.universe_obj = MagicMock()
+    controller._connected = True
+    return controller
+
+
+def test_send_now_reuses_frame_while_unchanged():
+    controller = _controller()
+    controller.set_channel(1, 200)
+
+    controller.send_now()
+    controller.send_now()
+
+    first, second = (call.args[0] for call in controller.universe_obj.set_dmx.call_args_list)
+    assert first is second
+    assert first[0] == 200
+
+
+def test_send_now_picks_up_channel_changes():
+    controller = _controller()
+    controller.send_now()
+
+    controller.set_channel_16bit(3, 0x1234)
+    controller.send_now()
+
+    frame = controller.universe_obj.set_dmx.call_args.args[0]
+    assert frame[2] == 0x12
+    assert frame[3] == 0x34
+
+
+def test_clear_all_zeroes_buffer_in_place():
+    controller = _controller()
+    buffer = controller.dmx_data
+    controller.set_channel(10, 255)
+
+    controller.clear_all()
+    controller.send_now()
+
+    assert controller.dmx_data is buffer
+    assert controller.get_channel(10) == 0
+    assert not any(controller.universe_obj.set_dmx.call_args.args[0])
+
+
+def test_set_channels_writes_and_clips_values():
+    controller = _controller()
+
+    assert controller.set_channels(np.array([1, 5, 512]), np.array([10, 300, -4]))
+
+    assert controller.get_channel(1) == 10
+    assert controller.get_channel(5) == 255
+    assert controller.get_channel(512) == 0
+
+
+def test_set_channels_rejects_out_of_range_channels():
+    controller = _controller()
+
+    assert not controller.set_channels(np.array([0, 1]), np.array([1, 1]))
+    assert not controller.dmx_data.any()
+
+
+def test_set_channels_16bit_matches_single_writes():
+    controller = _controller()
+    reference = _controller()
+    values = np.array([0x0102, 0xFFFF, 0x8000])
+
+    assert controller.set_channels_16bit(7, values)
+    for i, value in enumerate(values):
+        reference.set_channel_16bit(7 + 2 * i, int(value))
+
+    assert np.array_equal(controller.dmx_data, reference.dmx_data)
+    assert controller.get_channel_16bit(9) == 0xFFFF
+
+
+def test_set_channels_16bit_rejects_block_past_universe_end():
+    controller = _controller()
+
+    assert not controller.set_channels_16bit(511, np.array([1, 2]))
+
+
+@pytest.mark.asyncio
+async def test_connect_tunes_udp_socket():
+    controller = ArtNetController(source_ip="127.0.0.1", target_ip="127.0.0.255")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    controller.client = MagicMock()
+    controller.client.connect = AsyncMock()
+    controller.client.protocol.transport.get_extra_info.return_value = sock
+
+    try:
+        await controller.connect()
+
+        assert sock.getsockopt(socket.IPPROTO_IP, socket.IP_TOS) == 0xB8
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST)
+    finally:
+        sock.close()
+
+
+
+@pytest.mark.asyncio
+async def test_keepalive_resends_current_frame():
+    controller = ArtNetController(source_ip="127.0.0.1", target_ip="192.168.8.144")
+    controller.client.connect = AsyncMock()
+    protocol = ArtNetClientProtocol(controller.client)
+    protocol.transport = MagicMock()
+    controller.client.protocol = protocol
+    await controller.connect()
+
+    subscriber = MagicMock(spec=ArtNetNode, ip="192.168.8.144", udpport=6454)
+    controller.universe_obj.subscribers.append(subscriber)
+    controller.set_channel(1, 200)
+    controller.send_now()
+    # Due for the keep-alive, as if the last send was over a second ago
+    controller.universe_obj._last_publish = 0.0
+
+    poll = asyncio.create_task(protocol.art_poll_task())
+    try:
+        await asyncio.sleep(0.15)
+    finally:
+        poll.cancel()
+
+    frames = [
+        call.args[0] for call in protocol.transport.sendto.call_args_list
+        if call.kwargs["addr"] == ("192.168.8.144", 6454) and call.args[0][8:10] == b"\x00\x50"
+    ]
+    assert len(frames) == 2
+    assert all(frame[18] == 200 for frame in frames)
@@ -79,3 +79,20 @@ async def test_publisher_handles_broker_exception(output_publisher, mock_broker,
     await output_publisher.publish(mock_dict)
     #no assert, as it will work or fail depending on the outcome?
 
+
+
+@pytest.mark.asyncio
+async def test_publisher_failure_does_not_block_other_targets(output_publisher, mock_broker, mock_multi_dict):
+    async def publish(subject, payload):
+        if subject == "outputs.group1.pan":
+            raise Exception("Simulated NATS Connection Drop")
+
+    mock_broker.publish.side_effect = publish
+
+    await output_publisher.publish(mock_multi_dict)
+
+    assert mock_broker.publish.call_count == 3
+    mock_broker.publish.assert_has_calls([
+        call("outputs.group1.tilt", json.dumps({"value": 0.1}).encode("utf-8")),
+        call("outputs.group2.dim", json.dumps({"value": 0.0}).encode("utf-8")),
+    ], any_order=True)